@@ -9,8 +9,15 @@ d = { 'settings': { 'branch': 'main',
                                                                                'learntorank/evaluation.py'),
                                         'learntorank.evaluation.EvalMetric.__init__': ( 'module_evaluation.html#evalmetric.__init__',
                                                                                         'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.EvalMetric.evaluate_batch': ( 'module_evaluation.html#evalmetric.evaluate_batch',
+                                                                                              'learntorank/evaluation.py'),
                                         'learntorank.evaluation.EvalMetric.evaluate_query': ( 'module_evaluation.html#evalmetric.evaluate_query',
                                                                                               'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.Latency': ('module_evaluation.html#latency', 'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.Latency.__init__': ( 'module_evaluation.html#latency.__init__',
+                                                                                     'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.Latency.evaluate_query': ( 'module_evaluation.html#latency.evaluate_query',
+                                                                                           'learntorank/evaluation.py'),
                                         'learntorank.evaluation.MatchRatio': ( 'module_evaluation.html#matchratio',
                                                                                'learntorank/evaluation.py'),
                                         'learntorank.evaluation.MatchRatio.__init__': ( 'module_evaluation.html#matchratio.__init__',
@@ -23,28 +30,101 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                 'learntorank/evaluation.py'),
                                         'learntorank.evaluation.NormalizedDiscountedCumulativeGain._compute_dcg': ( 'module_evaluation.html#normalizeddiscountedcumulativegain._compute_dcg',
                                                                                                                     'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.NormalizedDiscountedCumulativeGain._cumulative_dcg': ( 'module_evaluation.html#normalizeddiscountedcumulativegain._cumulative_dcg',
+                                                                                                                       'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.NormalizedDiscountedCumulativeGain.evaluate_batch': ( 'module_evaluation.html#normalizeddiscountedcumulativegain.evaluate_batch',
+                                                                                                                      'learntorank/evaluation.py'),
                                         'learntorank.evaluation.NormalizedDiscountedCumulativeGain.evaluate_query': ( 'module_evaluation.html#normalizeddiscountedcumulativegain.evaluate_query',
                                                                                                                       'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.RankingBatch': ( 'module_evaluation.html#rankingbatch',
+                                                                                 'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.RankingBatch.__init__': ( 'module_evaluation.html#rankingbatch.__init__',
+                                                                                          'learntorank/evaluation.py'),
                                         'learntorank.evaluation.Recall': ('module_evaluation.html#recall', 'learntorank/evaluation.py'),
                                         'learntorank.evaluation.Recall.__init__': ( 'module_evaluation.html#recall.__init__',
                                                                                     'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.Recall.evaluate_batch': ( 'module_evaluation.html#recall.evaluate_batch',
+                                                                                          'learntorank/evaluation.py'),
                                         'learntorank.evaluation.Recall.evaluate_query': ( 'module_evaluation.html#recall.evaluate_query',
                                                                                           'learntorank/evaluation.py'),
                                         'learntorank.evaluation.ReciprocalRank': ( 'module_evaluation.html#reciprocalrank',
                                                                                    'learntorank/evaluation.py'),
                                         'learntorank.evaluation.ReciprocalRank.__init__': ( 'module_evaluation.html#reciprocalrank.__init__',
                                                                                             'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.ReciprocalRank.evaluate_batch': ( 'module_evaluation.html#reciprocalrank.evaluate_batch',
+                                                                                                  'learntorank/evaluation.py'),
                                         'learntorank.evaluation.ReciprocalRank.evaluate_query': ( 'module_evaluation.html#reciprocalrank.evaluate_query',
                                                                                                   'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.RelevanceIndex': ( 'module_evaluation.html#relevanceindex',
+                                                                                   'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.RelevanceIndex.__init__': ( 'module_evaluation.html#relevanceindex.__init__',
+                                                                                            'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.RelevanceIndex.__len__': ( 'module_evaluation.html#relevanceindex.__len__',
+                                                                                           'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.RelevanceIndex.ideal_matrix': ( 'module_evaluation.html#relevanceindex.ideal_matrix',
+                                                                                                'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.RetryPolicy': ( 'module_evaluation.html#retrypolicy',
+                                                                                'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.RetryPolicy.__init__': ( 'module_evaluation.html#retrypolicy.__init__',
+                                                                                         'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.RetryPolicy.delay': ( 'module_evaluation.html#retrypolicy.delay',
+                                                                                      'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.RetryPolicy.next_connections': ( 'module_evaluation.html#retrypolicy.next_connections',
+                                                                                                 'learntorank/evaluation.py'),
                                         'learntorank.evaluation.TimeQuery': ( 'module_evaluation.html#timequery',
                                                                               'learntorank/evaluation.py'),
                                         'learntorank.evaluation.TimeQuery.__init__': ( 'module_evaluation.html#timequery.__init__',
                                                                                        'learntorank/evaluation.py'),
                                         'learntorank.evaluation.TimeQuery.evaluate_query': ( 'module_evaluation.html#timequery.evaluate_query',
                                                                                              'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._EvaluationWriter': ( 'module_evaluation.html#_evaluationwriter',
+                                                                                      'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._EvaluationWriter.__init__': ( 'module_evaluation.html#_evaluationwriter.__init__',
+                                                                                               'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._EvaluationWriter.close': ( 'module_evaluation.html#_evaluationwriter.close',
+                                                                                            'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._EvaluationWriter.write': ( 'module_evaluation.html#_evaluationwriter.write',
+                                                                                            'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._NarrowQueryModel': ( 'module_evaluation.html#_narrowquerymodel',
+                                                                                      'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._NarrowQueryModel.__init__': ( 'module_evaluation.html#_narrowquerymodel.__init__',
+                                                                                               'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._NarrowQueryModel.create_body': ( 'module_evaluation.html#_narrowquerymodel.create_body',
+                                                                                                  'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._NarrowQueryModel.create_body_batch': ( 'module_evaluation.html#_narrowquerymodel.create_body_batch',
+                                                                                                        'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._NarrowQueryModel.narrow': ( 'module_evaluation.html#_narrowquerymodel.narrow',
+                                                                                             'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._OnlineSummary': ( 'module_evaluation.html#_onlinesummary',
+                                                                                   'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._OnlineSummary.__init__': ( 'module_evaluation.html#_onlinesummary.__init__',
+                                                                                            'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._OnlineSummary._aggregate': ( 'module_evaluation.html#_onlinesummary._aggregate',
+                                                                                              'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._OnlineSummary.summary': ( 'module_evaluation.html#_onlinesummary.summary',
+                                                                                           'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._OnlineSummary.supports': ( 'module_evaluation.html#_onlinesummary.supports',
+                                                                                            'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._OnlineSummary.update': ( 'module_evaluation.html#_onlinesummary.update',
+                                                                                          'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._cutoffs': ('module_evaluation.html#_cutoffs', 'learntorank/evaluation.py'),
                                         'learntorank.evaluation._evaluate_query_retry': ( 'module_evaluation.html#_evaluate_query_retry',
                                                                                           'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._get_ranking_batch': ( 'module_evaluation.html#_get_ranking_batch',
+                                                                                       'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._has_errors': ( 'module_evaluation.html#_has_errors',
+                                                                                'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._labeled_data_windows': ( 'module_evaluation.html#_labeled_data_windows',
+                                                                                          'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._merge_failure_stats': ( 'module_evaluation.html#_merge_failure_stats',
+                                                                                         'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._narrow_query_model': ( 'module_evaluation.html#_narrow_query_model',
+                                                                                        'learntorank/evaluation.py'),
+                                        'learntorank.evaluation._percentile_level': ( 'module_evaluation.html#_percentile_level',
+                                                                                      'learntorank/evaluation.py'),
                                         'learntorank.evaluation.evaluate': ('module_evaluation.html#evaluate', 'learntorank/evaluation.py'),
+                                        'learntorank.evaluation.evaluate_async': ( 'module_evaluation.html#evaluate_async',
+                                                                                   'learntorank/evaluation.py'),
                                         'learntorank.evaluation.evaluate_query': ( 'module_evaluation.html#evaluate_query',
                                                                                    'learntorank/evaluation.py')},
             'learntorank.ml': { 'learntorank.ml.BertModelConfig': ('module_ml.html#bertmodelconfig', 'learntorank/ml.py'),
@@ -145,12 +225,51 @@ d = { 'settings': { 'branch': 'main',
                                                                                   'learntorank/query.py'),
                                    'learntorank.query.AND.get_query_properties': ( 'module_query.html#and.get_query_properties',
                                                                                    'learntorank/query.py'),
+                                   'learntorank.query.AND.match_filter_template': ( 'module_query.html#and.match_filter_template',
+                                                                                    'learntorank/query.py'),
                                    'learntorank.query.ANN': ('module_query.html#ann', 'learntorank/query.py'),
                                    'learntorank.query.ANN.__init__': ('module_query.html#ann.__init__', 'learntorank/query.py'),
                                    'learntorank.query.ANN.create_match_filter': ( 'module_query.html#ann.create_match_filter',
                                                                                   'learntorank/query.py'),
                                    'learntorank.query.ANN.get_query_properties': ( 'module_query.html#ann.get_query_properties',
                                                                                    'learntorank/query.py'),
+                                   'learntorank.query.ANN.match_filter_template': ( 'module_query.html#ann.match_filter_template',
+                                                                                    'learntorank/query.py'),
+                                   'learntorank.query.BatchQueryRankingFeature': ( 'module_query.html#batchqueryrankingfeature',
+                                                                                   'learntorank/query.py'),
+                                   'learntorank.query.BatchQueryRankingFeature.__init__': ( 'module_query.html#batchqueryrankingfeature.__init__',
+                                                                                            'learntorank/query.py'),
+                                   'learntorank.query.BatchQueryRankingFeature.get_batch_query_properties': ( 'module_query.html#batchqueryrankingfeature.get_batch_query_properties',
+                                                                                                              'learntorank/query.py'),
+                                   'learntorank.query.BatchQueryRankingFeature.get_query_properties': ( 'module_query.html#batchqueryrankingfeature.get_query_properties',
+                                                                                                        'learntorank/query.py'),
+                                   'learntorank.query.LabeledData': ('module_query.html#labeleddata', 'learntorank/query.py'),
+                                   'learntorank.query.LabeledData.__getitem__': ( 'module_query.html#labeleddata.__getitem__',
+                                                                                  'learntorank/query.py'),
+                                   'learntorank.query.LabeledData.__init__': ( 'module_query.html#labeleddata.__init__',
+                                                                               'learntorank/query.py'),
+                                   'learntorank.query.LabeledData.__iter__': ( 'module_query.html#labeleddata.__iter__',
+                                                                               'learntorank/query.py'),
+                                   'learntorank.query.LabeledData.__len__': ( 'module_query.html#labeleddata.__len__',
+                                                                              'learntorank/query.py'),
+                                   'learntorank.query.LabeledData.__repr__': ( 'module_query.html#labeleddata.__repr__',
+                                                                               'learntorank/query.py'),
+                                   'learntorank.query.LabeledData._record': ( 'module_query.html#labeleddata._record',
+                                                                              'learntorank/query.py'),
+                                   'learntorank.query.LabeledData.from_arrow': ( 'module_query.html#labeleddata.from_arrow',
+                                                                                 'learntorank/query.py'),
+                                   'learntorank.query.LabeledData.from_df': ( 'module_query.html#labeleddata.from_df',
+                                                                              'learntorank/query.py'),
+                                   'learntorank.query.LabeledData.from_records': ( 'module_query.html#labeleddata.from_records',
+                                                                                   'learntorank/query.py'),
+                                   'learntorank.query.LabeledData.to_df': ('module_query.html#labeleddata.to_df', 'learntorank/query.py'),
+                                   'learntorank.query.LabeledData.to_records': ( 'module_query.html#labeleddata.to_records',
+                                                                                 'learntorank/query.py'),
+                                   'learntorank.query.LoadSchedule': ('module_query.html#loadschedule', 'learntorank/query.py'),
+                                   'learntorank.query.LoadSchedule.__init__': ( 'module_query.html#loadschedule.__init__',
+                                                                                'learntorank/query.py'),
+                                   'learntorank.query.LoadSchedule.arrival_times': ( 'module_query.html#loadschedule.arrival_times',
+                                                                                     'learntorank/query.py'),
                                    'learntorank.query.MatchFilter': ('module_query.html#matchfilter', 'learntorank/query.py'),
                                    'learntorank.query.MatchFilter.__init__': ( 'module_query.html#matchfilter.__init__',
                                                                                'learntorank/query.py'),
@@ -158,28 +277,66 @@ d = { 'settings': { 'branch': 'main',
                                                                                           'learntorank/query.py'),
                                    'learntorank.query.MatchFilter.get_query_properties': ( 'module_query.html#matchfilter.get_query_properties',
                                                                                            'learntorank/query.py'),
+                                   'learntorank.query.MatchFilter.match_filter_template': ( 'module_query.html#matchfilter.match_filter_template',
+                                                                                            'learntorank/query.py'),
                                    'learntorank.query.OR': ('module_query.html#or', 'learntorank/query.py'),
                                    'learntorank.query.OR.__init__': ('module_query.html#or.__init__', 'learntorank/query.py'),
                                    'learntorank.query.OR.create_match_filter': ( 'module_query.html#or.create_match_filter',
                                                                                  'learntorank/query.py'),
                                    'learntorank.query.OR.get_query_properties': ( 'module_query.html#or.get_query_properties',
                                                                                   'learntorank/query.py'),
+                                   'learntorank.query.OR.match_filter_template': ( 'module_query.html#or.match_filter_template',
+                                                                                   'learntorank/query.py'),
+                                   'learntorank.query.QueryCache': ('module_query.html#querycache', 'learntorank/query.py'),
+                                   'learntorank.query.QueryCache.__init__': ( 'module_query.html#querycache.__init__',
+                                                                              'learntorank/query.py'),
+                                   'learntorank.query.QueryCache._remember': ( 'module_query.html#querycache._remember',
+                                                                               'learntorank/query.py'),
+                                   'learntorank.query.QueryCache.clear': ('module_query.html#querycache.clear', 'learntorank/query.py'),
+                                   'learntorank.query.QueryCache.get': ('module_query.html#querycache.get', 'learntorank/query.py'),
+                                   'learntorank.query.QueryCache.key': ('module_query.html#querycache.key', 'learntorank/query.py'),
+                                   'learntorank.query.QueryCache.put': ('module_query.html#querycache.put', 'learntorank/query.py'),
+                                   'learntorank.query.QueryFeatureMemo': ('module_query.html#queryfeaturememo', 'learntorank/query.py'),
+                                   'learntorank.query.QueryFeatureMemo.__init__': ( 'module_query.html#queryfeaturememo.__init__',
+                                                                                    'learntorank/query.py'),
+                                   'learntorank.query.QueryFeatureMemo.map': ( 'module_query.html#queryfeaturememo.map',
+                                                                               'learntorank/query.py'),
                                    'learntorank.query.QueryModel': ('module_query.html#querymodel', 'learntorank/query.py'),
                                    'learntorank.query.QueryModel.__init__': ( 'module_query.html#querymodel.__init__',
                                                                               'learntorank/query.py'),
+                                   'learntorank.query.QueryModel._body_template': ( 'module_query.html#querymodel._body_template',
+                                                                                    'learntorank/query.py'),
                                    'learntorank.query.QueryModel.create_body': ( 'module_query.html#querymodel.create_body',
                                                                                  'learntorank/query.py'),
+                                   'learntorank.query.QueryModel.create_body_batch': ( 'module_query.html#querymodel.create_body_batch',
+                                                                                       'learntorank/query.py'),
                                    'learntorank.query.QueryProperty': ('module_query.html#queryproperty', 'learntorank/query.py'),
                                    'learntorank.query.QueryProperty.__init__': ( 'module_query.html#queryproperty.__init__',
                                                                                  'learntorank/query.py'),
+                                   'learntorank.query.QueryProperty.get_batch_query_properties': ( 'module_query.html#queryproperty.get_batch_query_properties',
+                                                                                                   'learntorank/query.py'),
                                    'learntorank.query.QueryProperty.get_query_properties': ( 'module_query.html#queryproperty.get_query_properties',
                                                                                              'learntorank/query.py'),
                                    'learntorank.query.QueryRankingFeature': ( 'module_query.html#queryrankingfeature',
                                                                               'learntorank/query.py'),
                                    'learntorank.query.QueryRankingFeature.__init__': ( 'module_query.html#queryrankingfeature.__init__',
                                                                                        'learntorank/query.py'),
+                                   'learntorank.query.QueryRankingFeature.get_batch_query_properties': ( 'module_query.html#queryrankingfeature.get_batch_query_properties',
+                                                                                                         'learntorank/query.py'),
                                    'learntorank.query.QueryRankingFeature.get_query_properties': ( 'module_query.html#queryrankingfeature.get_query_properties',
                                                                                                    'learntorank/query.py'),
+                                   'learntorank.query.QuerySession': ('module_query.html#querysession', 'learntorank/query.py'),
+                                   'learntorank.query.QuerySession.__enter__': ( 'module_query.html#querysession.__enter__',
+                                                                                 'learntorank/query.py'),
+                                   'learntorank.query.QuerySession.__exit__': ( 'module_query.html#querysession.__exit__',
+                                                                                'learntorank/query.py'),
+                                   'learntorank.query.QuerySession.__init__': ( 'module_query.html#querysession.__init__',
+                                                                                'learntorank/query.py'),
+                                   'learntorank.query.QuerySession.close': ('module_query.html#querysession.close', 'learntorank/query.py'),
+                                   'learntorank.query.QuerySession.open': ('module_query.html#querysession.open', 'learntorank/query.py'),
+                                   'learntorank.query.QuerySession.query': ('module_query.html#querysession.query', 'learntorank/query.py'),
+                                   'learntorank.query.QuerySession.query_batch': ( 'module_query.html#querysession.query_batch',
+                                                                                   'learntorank/query.py'),
                                    'learntorank.query.Ranking': ('module_query.html#ranking', 'learntorank/query.py'),
                                    'learntorank.query.Ranking.__init__': ('module_query.html#ranking.__init__', 'learntorank/query.py'),
                                    'learntorank.query.Tokenize': ('module_query.html#tokenize', 'learntorank/query.py'),
@@ -188,24 +345,69 @@ d = { 'settings': { 'branch': 'main',
                                                                                        'learntorank/query.py'),
                                    'learntorank.query.Tokenize.get_query_properties': ( 'module_query.html#tokenize.get_query_properties',
                                                                                         'learntorank/query.py'),
+                                   'learntorank.query.Tokenize.match_filter_template': ( 'module_query.html#tokenize.match_filter_template',
+                                                                                         'learntorank/query.py'),
                                    'learntorank.query.Union': ('module_query.html#union', 'learntorank/query.py'),
                                    'learntorank.query.Union.__init__': ('module_query.html#union.__init__', 'learntorank/query.py'),
                                    'learntorank.query.Union.create_match_filter': ( 'module_query.html#union.create_match_filter',
                                                                                     'learntorank/query.py'),
                                    'learntorank.query.Union.get_query_properties': ( 'module_query.html#union.get_query_properties',
                                                                                      'learntorank/query.py'),
+                                   'learntorank.query.Union.match_filter_template': ( 'module_query.html#union.match_filter_template',
+                                                                                      'learntorank/query.py'),
                                    'learntorank.query.WeakAnd': ('module_query.html#weakand', 'learntorank/query.py'),
                                    'learntorank.query.WeakAnd.__init__': ('module_query.html#weakand.__init__', 'learntorank/query.py'),
                                    'learntorank.query.WeakAnd.create_match_filter': ( 'module_query.html#weakand.create_match_filter',
                                                                                       'learntorank/query.py'),
                                    'learntorank.query.WeakAnd.get_query_properties': ( 'module_query.html#weakand.get_query_properties',
                                                                                        'learntorank/query.py'),
-                                   'learntorank.query._annotate_data': ('module_query.html#_annotate_data', 'learntorank/query.py'),
+                                   'learntorank.query.WeakAnd.match_filter_template': ( 'module_query.html#weakand.match_filter_template',
+                                                                                        'learntorank/query.py'),
+                                   'learntorank.query._FeatureColumns': ('module_query.html#_featurecolumns', 'learntorank/query.py'),
+                                   'learntorank.query._FeatureColumns.__init__': ( 'module_query.html#_featurecolumns.__init__',
+                                                                                   'learntorank/query.py'),
+                                   'learntorank.query._FeatureColumns._layout': ( 'module_query.html#_featurecolumns._layout',
+                                                                                  'learntorank/query.py'),
+                                   'learntorank.query._FeatureColumns._position': ( 'module_query.html#_featurecolumns._position',
+                                                                                    'learntorank/query.py'),
+                                   'learntorank.query._FeatureColumns._set': ( 'module_query.html#_featurecolumns._set',
+                                                                               'learntorank/query.py'),
+                                   'learntorank.query._FeatureColumns.add': ( 'module_query.html#_featurecolumns.add',
+                                                                              'learntorank/query.py'),
+                                   'learntorank.query._FeatureColumns.to_df': ( 'module_query.html#_featurecolumns.to_df',
+                                                                                'learntorank/query.py'),
+                                   'learntorank.query._apply_feature_schema': ( 'module_query.html#_apply_feature_schema',
+                                                                                'learntorank/query.py'),
                                    'learntorank.query._build_query_body': ('module_query.html#_build_query_body', 'learntorank/query.py'),
+                                   'learntorank.query._build_query_body_batch': ( 'module_query.html#_build_query_body_batch',
+                                                                                  'learntorank/query.py'),
+                                   'learntorank.query._create_body_batch': ('module_query.html#_create_body_batch', 'learntorank/query.py'),
+                                   'learntorank.query._escape_query': ('module_query.html#_escape_query', 'learntorank/query.py'),
+                                   'learntorank.query._extract_features': ('module_query.html#_extract_features', 'learntorank/query.py'),
+                                   'learntorank.query._failed_response': ('module_query.html#_failed_response', 'learntorank/query.py'),
+                                   'learntorank.query._feature_shard_paths': ( 'module_query.html#_feature_shard_paths',
+                                                                               'learntorank/query.py'),
+                                   'learntorank.query._feature_shard_schema': ( 'module_query.html#_feature_shard_schema',
+                                                                                'learntorank/query.py'),
+                                   'learntorank.query._flat_array': ('module_query.html#_flat_array', 'learntorank/query.py'),
+                                   'learntorank.query._iter_vespa_feature_shards': ( 'module_query.html#_iter_vespa_feature_shards',
+                                                                                     'learntorank/query.py'),
+                                   'learntorank.query._load_test_report': ('module_query.html#_load_test_report', 'learntorank/query.py'),
                                    'learntorank.query._parse_labeled_data': ( 'module_query.html#_parse_labeled_data',
                                                                               'learntorank/query.py'),
+                                   'learntorank.query._query_once': ('module_query.html#_query_once', 'learntorank/query.py'),
+                                   'learntorank.query._read_feature_shard': ( 'module_query.html#_read_feature_shard',
+                                                                              'learntorank/query.py'),
+                                   'learntorank.query._serialize_query_features': ( 'module_query.html#_serialize_query_features',
+                                                                                    'learntorank/query.py'),
+                                   'learntorank.query._write_feature_shard': ( 'module_query.html#_write_feature_shard',
+                                                                               'learntorank/query.py'),
                                    'learntorank.query.collect_vespa_features': ( 'module_query.html#collect_vespa_features',
                                                                                  'learntorank/query.py'),
+                                   'learntorank.query.load_test': ('module_query.html#load_test', 'learntorank/query.py'),
+                                   'learntorank.query.load_test_async': ('module_query.html#load_test_async', 'learntorank/query.py'),
+                                   'learntorank.query.read_vespa_features': ( 'module_query.html#read_vespa_features',
+                                                                              'learntorank/query.py'),
                                    'learntorank.query.send_query': ('module_query.html#send_query', 'learntorank/query.py'),
                                    'learntorank.query.send_query_batch': ('module_query.html#send_query_batch', 'learntorank/query.py'),
                                    'learntorank.query.store_vespa_features': ( 'module_query.html#store_vespa_features',
@@ -244,6 +446,8 @@ d = { 'settings': { 'branch': 'main',
                                                                                                                     'learntorank/ranking.py'),
                                      'learntorank.ranking.ListwiseRankingFramework.listwise_tf_dataset_from_df': ( 'module_ranking.html#listwiserankingframework.listwise_tf_dataset_from_df',
                                                                                                                    'learntorank/ranking.py'),
+                                     'learntorank.ranking.ListwiseRankingFramework.listwise_tf_dataset_from_shards': ( 'module_ranking.html#listwiserankingframework.listwise_tf_dataset_from_shards',
+                                                                                                                       'learntorank/ranking.py'),
                                      'learntorank.ranking.ListwiseRankingFramework.tune_model': ( 'module_ranking.html#listwiserankingframework.tune_model',
                                                                                                   'learntorank/ranking.py'),
                                      'learntorank.ranking.keras_lasso_linear_model': ( 'module_ranking.html#keras_lasso_linear_model',
@@ -252,6 +456,67 @@ d = { 'settings': { 'branch': 'main',
                                                                                  'learntorank/ranking.py'),
                                      'learntorank.ranking.keras_ndcg_compiled_model': ( 'module_ranking.html#keras_ndcg_compiled_model',
                                                                                         'learntorank/ranking.py')},
-            'learntorank.stats': { 'learntorank.stats.bootstrap_sampling': ('module_stats.html#bootstrap_sampling', 'learntorank/stats.py'),
+            'learntorank.stats': { 'learntorank.stats.LatencyHistogram': ('module_stats.html#latencyhistogram', 'learntorank/stats.py'),
+                                   'learntorank.stats.LatencyHistogram.__init__': ( 'module_stats.html#latencyhistogram.__init__',
+                                                                                    'learntorank/stats.py'),
+                                   'learntorank.stats.LatencyHistogram.bounds': ( 'module_stats.html#latencyhistogram.bounds',
+                                                                                  'learntorank/stats.py'),
+                                   'learntorank.stats.LatencyHistogram.buckets': ( 'module_stats.html#latencyhistogram.buckets',
+                                                                                   'learntorank/stats.py'),
+                                   'learntorank.stats.LatencyHistogram.merge': ( 'module_stats.html#latencyhistogram.merge',
+                                                                                 'learntorank/stats.py'),
+                                   'learntorank.stats.LatencyHistogram.percentile': ( 'module_stats.html#latencyhistogram.percentile',
+                                                                                      'learntorank/stats.py'),
+                                   'learntorank.stats.LatencyHistogram.record': ( 'module_stats.html#latencyhistogram.record',
+                                                                                  'learntorank/stats.py'),
+                                   'learntorank.stats.QuantileSketch': ('module_stats.html#quantilesketch', 'learntorank/stats.py'),
+                                   'learntorank.stats.QuantileSketch.__init__': ( 'module_stats.html#quantilesketch.__init__',
+                                                                                  'learntorank/stats.py'),
+                                   'learntorank.stats.QuantileSketch._flush': ( 'module_stats.html#quantilesketch._flush',
+                                                                                'learntorank/stats.py'),
+                                   'learntorank.stats.QuantileSketch.merge': ( 'module_stats.html#quantilesketch.merge',
+                                                                               'learntorank/stats.py'),
+                                   'learntorank.stats.QuantileSketch.quantile': ( 'module_stats.html#quantilesketch.quantile',
+                                                                                  'learntorank/stats.py'),
+                                   'learntorank.stats.QuantileSketch.update': ( 'module_stats.html#quantilesketch.update',
+                                                                                'learntorank/stats.py'),
+                                   'learntorank.stats.RunningMoments': ('module_stats.html#runningmoments', 'learntorank/stats.py'),
+                                   'learntorank.stats.RunningMoments.__init__': ( 'module_stats.html#runningmoments.__init__',
+                                                                                  'learntorank/stats.py'),
+                                   'learntorank.stats.RunningMoments._combine': ( 'module_stats.html#runningmoments._combine',
+                                                                                  'learntorank/stats.py'),
+                                   'learntorank.stats.RunningMoments.merge': ( 'module_stats.html#runningmoments.merge',
+                                                                               'learntorank/stats.py'),
+                                   'learntorank.stats.RunningMoments.std': ('module_stats.html#runningmoments.std', 'learntorank/stats.py'),
+                                   'learntorank.stats.RunningMoments.update': ( 'module_stats.html#runningmoments.update',
+                                                                                'learntorank/stats.py'),
+                                   'learntorank.stats.RunningMoments.var': ('module_stats.html#runningmoments.var', 'learntorank/stats.py'),
+                                   'learntorank.stats.StreamingBootstrap': ('module_stats.html#streamingbootstrap', 'learntorank/stats.py'),
+                                   'learntorank.stats.StreamingBootstrap.__init__': ( 'module_stats.html#streamingbootstrap.__init__',
+                                                                                      'learntorank/stats.py'),
+                                   'learntorank.stats.StreamingBootstrap.estimates': ( 'module_stats.html#streamingbootstrap.estimates',
+                                                                                       'learntorank/stats.py'),
+                                   'learntorank.stats.StreamingBootstrap.merge': ( 'module_stats.html#streamingbootstrap.merge',
+                                                                                   'learntorank/stats.py'),
+                                   'learntorank.stats.StreamingBootstrap.update': ( 'module_stats.html#streamingbootstrap.update',
+                                                                                    'learntorank/stats.py'),
+                                   'learntorank.stats._bootstrap_chunks': ('module_stats.html#_bootstrap_chunks', 'learntorank/stats.py'),
+                                   'learntorank.stats._bootstrap_executor': ( 'module_stats.html#_bootstrap_executor',
+                                                                              'learntorank/stats.py'),
+                                   'learntorank.stats._bootstrap_values': ('module_stats.html#_bootstrap_values', 'learntorank/stats.py'),
+                                   'learntorank.stats._compress_centroids': ( 'module_stats.html#_compress_centroids',
+                                                                              'learntorank/stats.py'),
+                                   'learntorank.stats._estimate_chunk': ('module_stats.html#_estimate_chunk', 'learntorank/stats.py'),
+                                   'learntorank.stats._interval_table': ('module_stats.html#_interval_table', 'learntorank/stats.py'),
+                                   'learntorank.stats._paired_differences': ( 'module_stats.html#_paired_differences',
+                                                                              'learntorank/stats.py'),
+                                   'learntorank.stats._paired_summary': ('module_stats.html#_paired_summary', 'learntorank/stats.py'),
+                                   'learntorank.stats._resample_indices': ('module_stats.html#_resample_indices', 'learntorank/stats.py'),
+                                   'learntorank.stats.bootstrap_sampling': ('module_stats.html#bootstrap_sampling', 'learntorank/stats.py'),
                                    'learntorank.stats.compute_evaluation_estimates': ( 'module_stats.html#compute_evaluation_estimates',
-                                                                                       'learntorank/stats.py')}}}
\ No newline at end of file
+                                                                                       'learntorank/stats.py'),
+                                   'learntorank.stats.compute_streaming_evaluation_estimates': ( 'module_stats.html#compute_streaming_evaluation_estimates',
+                                                                                                 'learntorank/stats.py'),
+                                   'learntorank.stats.paired_bootstrap_test': ( 'module_stats.html#paired_bootstrap_test',
+                                                                                'learntorank/stats.py'),
+                                   'learntorank.stats.permutation_test': ('module_stats.html#permutation_test', 'learntorank/stats.py')}}}
\ No newline at end of file
@@ -1,17 +1,24 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../002_module_evaluation.ipynb.
 
 # %% auto 0
-__all__ = ['EvalMetric', 'MatchRatio', 'TimeQuery', 'Recall', 'ReciprocalRank', 'NormalizedDiscountedCumulativeGain', 'evaluate',
-           'evaluate_query']
+__all__ = ['EvalMetric', 'RelevanceIndex', 'RankingBatch', 'MatchRatio', 'TimeQuery', 'Latency', 'Recall', 'ReciprocalRank',
+           'NormalizedDiscountedCumulativeGain', 'RetryPolicy', 'evaluate', 'evaluate_async', 'evaluate_query']
 
 # %% ../002_module_evaluation.ipynb 4
+import asyncio
 import math
-from typing import Dict, List, Union
+import re
+import sys
+import time
+from itertools import accumulate, islice
+import numpy as np
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from fastcore.utils import patch, patch_to
-from pandas import DataFrame
+from pandas import DataFrame, Index, MultiIndex, Series, concat
 from vespa.io import VespaQueryResponse
 from vespa.application import Vespa
-from .query import QueryModel, send_query, send_query_batch, _parse_labeled_data
+from .stats import LatencyHistogram, RunningMoments, QuantileSketch
+from .query import QueryModel, QueryCache, QueryFeatureMemo, QuerySession, LabeledData, send_query, send_query_batch, _build_query_body, _create_body_batch, _failed_response
 
 # %% ../002_module_evaluation.ipynb 7
 class EvalMetric(object):
@@ -33,13 +40,124 @@ def evaluate_query(
     raise NotImplementedError
 
 # %% ../002_module_evaluation.ipynb 9
+class RelevanceIndex(object):
+    def __init__(
+        self,
+        relevant_docs: List[List[Dict]],  # Relevant docs of each query. Each dict contains a doc id a optionally a doc score.
+        default_score: int = 0,  # Score to assign to relevant docs without a score.
+    ) -> None:
+        """
+        Relevance judgments of a list of queries compiled once to be shared by every metric and query model.
+
+        Document ids are converted to interned strings a single time. For each query we keep a map from id to 
+        score, the set of relevant ids (score > 0) and the scores sorted in decreasing order (ideal gains).
+        """
+        self.default_score = default_score
+        self.scores = []  # id -> score of each query
+        self.relevant_ids = []  # ids with score > 0 of each query
+        self.ideal_scores = []  # scores sorted in decreasing order of each query
+        for docs in relevant_docs:
+            scores = {
+                sys.intern(str(doc["id"])): doc.get("score", default_score) for doc in docs
+            }
+            self.scores.append(scores)
+            self.relevant_ids.append(
+                frozenset(doc_id for doc_id, score in scores.items() if score > 0)
+            )
+            self.ideal_scores.append(np.sort(np.array(list(scores.values()), dtype=float))[::-1])
+        self.n_relevant = np.array([len(x) for x in self.relevant_ids], dtype=np.int64)
+        self._ideal_matrices = {}
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+# %% ../002_module_evaluation.ipynb 10
+@patch
+def ideal_matrix(
+    self: RelevanceIndex,
+    at: int,  # Number of positions to keep.
+) -> np.ndarray:  # `(n_queries, at)` matrix of ideal scores padded with `default_score`.
+    "Ideal scores of the top `at` positions of each query, computed once per `at`."
+    if at not in self._ideal_matrices:
+        matrix = np.full((len(self), at), self.default_score, dtype=float)
+        for row, ideal in enumerate(self.ideal_scores):
+            matrix[row, : min(at, len(ideal))] = ideal[:at]
+        self._ideal_matrices[at] = matrix
+    return self._ideal_matrices[at]
+
+# %% ../002_module_evaluation.ipynb 11
+class RankingBatch(object):
+    def __init__(
+        self,
+        query_results: List[VespaQueryResponse],  # Raw query results returned by Vespa, one per query.
+        relevant_docs: Union[List[List[Dict]], RelevanceIndex],  # Relevant docs of each query, raw or compiled in a `RelevanceIndex`.
+        id_field: str,  # The Vespa field representing the document id.
+        default_score: int,  # Score to assign to the additional documents that are not relevant.
+        at: int,  # Number of top hits to keep for each query.
+    ) -> None:
+        """
+        Padded matrices describing the top `at` hits of a batch of query results.
+
+        The hits of every query are parsed once into a `(n_queries, at)` matrix of interned document ids 
+        (`-1` for padding and hits without `id_field`) and matrices with the relevance of each hit, 
+        so that metrics can be computed with array operations for every query at once. Pass a `RelevanceIndex` 
+        to reuse relevance judgments compiled once across query models.
+        """
+        if not isinstance(relevant_docs, RelevanceIndex):
+            relevant_docs = RelevanceIndex(relevant_docs, default_score)
+        n_queries = len(query_results)
+        self.at = at
+        self.hit_ids = np.full((n_queries, at), -1, dtype=np.int64)
+        self.scores = np.full((n_queries, at), default_score, dtype=float)
+        self.relevant = np.zeros((n_queries, at), dtype=bool)  # hits relevant docs with score > 0
+        self.missing_id = np.zeros((n_queries, at), dtype=bool)  # hits without `id_field`
+        self.first = np.zeros((n_queries, at), dtype=bool)  # first occurrence of each document id
+        self.ideal_scores = relevant_docs.ideal_matrix(at)
+        self.n_relevant = relevant_docs.n_relevant  # number of docs with score > 0
+        interned_ids = {}
+        rows = zip(query_results, relevant_docs.scores, relevant_docs.relevant_ids)
+        for row, (query_result, relevant_scores, relevant_ids) in enumerate(rows):
+            seen = set()
+            for col, hit in enumerate(query_result.hits[:at]):
+                try:
+                    doc_id = str(hit["fields"][id_field])
+                except KeyError:
+                    self.missing_id[row, col] = True
+                    continue
+                self.hit_ids[row, col] = interned_ids.setdefault(doc_id, len(interned_ids))
+                self.scores[row, col] = relevant_scores.get(doc_id, default_score)
+                self.relevant[row, col] = doc_id in relevant_ids
+                if doc_id not in seen:
+                    self.first[row, col] = True
+                    seen.add(doc_id)
+
+# %% ../002_module_evaluation.ipynb 12
+@patch
+def evaluate_batch(
+    self: EvalMetric,
+    query_results: List[VespaQueryResponse],  # Raw query results returned by Vespa, one per query.
+    relevant_docs: List[List[Dict]],  # Relevant docs of each query. Each dict contains a doc id a optionally a doc score.
+    id_field: str,  # The Vespa field representing the document id.
+    default_score: int,  # Score to assign to the additional documents that are not relevant. Default to 0.
+    detailed_metrics=False,  # Return intermediate computations if available.
+    ranking_batch: Optional[RankingBatch] = None,  # Relevance matrices of the batch, shared by the metrics evaluating the same batch.
+) -> Dict[str, np.ndarray]:  # Metric values, one array entry per query.
+    "Evaluate a batch of query results. Metrics without a vectorized implementation call `evaluate_query` once per query."
+    evaluations = [
+        self.evaluate_query(query_result, docs, id_field, default_score, detailed_metrics)
+        for query_result, docs in zip(query_results, relevant_docs)
+    ]
+    keys = evaluations[0].keys() if len(evaluations) > 0 else []
+    return {key: np.array([x[key] for x in evaluations]) for key in keys}
+
+# %% ../002_module_evaluation.ipynb 13
 class MatchRatio(EvalMetric):
     def __init__(self) -> None:
         "Computes the ratio of documents retrieved by the match phase."
         super().__init__()
         self.name = "match_ratio"
 
-# %% ../002_module_evaluation.ipynb 12
+# %% ../002_module_evaluation.ipynb 16
 @patch
 def evaluate_query(
     self: MatchRatio,
@@ -68,14 +186,14 @@ def evaluate_query(
         )
     return metrics
 
-# %% ../002_module_evaluation.ipynb 26
+# %% ../002_module_evaluation.ipynb 30
 class TimeQuery(EvalMetric):
     def __init__(self) -> None:
         "Compute the time it takes for Vespa to execute the query.."
         super().__init__()
         self.name = "search_time"
 
-# %% ../002_module_evaluation.ipynb 29
+# %% ../002_module_evaluation.ipynb 33
 @patch
 def evaluate_query(
     self: TimeQuery,
@@ -106,18 +224,58 @@ def evaluate_query(
         )
     return metrics
 
-# %% ../002_module_evaluation.ipynb 38
+# %% ../002_module_evaluation.ipynb 42
+class Latency(EvalMetric):
+    def __init__(self) -> None:
+        """
+        Server and client round-trip time of each query, in seconds.
+
+        The server time is the `searchtime` reported by Vespa when the request asks for `presentation.timing`, 
+        which `evaluate` and `evaluate_async` add to the queries. The client time is measured around each request 
+        by `evaluate_async` and `QuerySession`, e.g. when passed as the `session` of `evaluate`, and is missing (NaN) 
+        otherwise, e.g. for cached responses. Both times are also recorded into a `LatencyHistogram` per query model.
+        """
+        super().__init__()
+        self.name = "latency"
+
+# %% ../002_module_evaluation.ipynb 43
+@patch
+def evaluate_query(
+    self: Latency,
+    query_results: VespaQueryResponse,  # Raw query results returned by Vespa.
+    relevant_docs: List[Dict],  # Each dict contains a doc id a optionally a doc score.
+    id_field: str,  # The Vespa field representing the document id.
+    default_score: int,  # Score to assign to the additional documents that are not relevant. Default to 0.
+    detailed_metrics=False,  # Return intermediate computations if available.
+) -> Dict:  # Returns the server time `_server_time` and the client time `_client_time`, NaN when not available.
+    "Evaluate query results according to latency metric."
+    return {
+        str(self.name) + "_server_time": query_results.json.get("timing", {}).get("searchtime", np.nan),
+        str(self.name) + "_client_time": getattr(query_results, "client_time", np.nan),
+    }
+
+# %% ../002_module_evaluation.ipynb 47
+def _cutoffs(
+    at: Union[int, List[int]]  # A position or a list of positions.
+) -> List[int]:  # Positions sorted in increasing order.
+    cutoffs = [at] if isinstance(at, int) else sorted(set(at))
+    assert len(cutoffs) > 0 and all([x > 0 for x in cutoffs]), "Positions must be positive integers."
+    return cutoffs
+
+# %% ../002_module_evaluation.ipynb 48
 class Recall(EvalMetric):
     def __init__(
         self, 
-        at: int  # Maximum position on the resulting list to look for relevant docs.
+        at: Union[int, List[int]]  # Maximum position on the resulting list to look for relevant docs. Use a list to compute the metric at many positions from a single pass over the hits.
     ) -> None:
         "Compute the recall at position `at`."
         super().__init__()
-        self.name = "recall_" + str(at)
-        self.at = at
+        self.cutoffs = _cutoffs(at)
+        self.names = ["recall_" + str(x) for x in self.cutoffs]
+        self.name = "recall_" + "_".join([str(x) for x in self.cutoffs])
+        self.at = max(self.cutoffs)
 
-# %% ../002_module_evaluation.ipynb 41
+# %% ../002_module_evaluation.ipynb 51
 @patch
 def evaluate_query(
     self: Recall,
@@ -135,27 +293,43 @@ def evaluate_query(
     """
 
     relevant_ids = {str(doc["id"]) for doc in relevant_docs if doc.get("score", default_score) > 0}
-    try:
-        retrieved_ids = {
-            str(hit["fields"][id_field]) for hit in query_results.hits[: self.at]
-        }
-    except KeyError:
-        retrieved_ids = set()
+    # number of relevant docs among the first `idx` hits, computed once for every cutoff
+    found = [0]
+    retrieved_ids = set()
+    missing_id_position = None
+    for idx, hit in enumerate(query_results.hits[: self.at]):
+        try:
+            doc_id = str(hit["fields"][id_field])
+        except KeyError:
+            missing_id_position = idx
+            break
+        found.append(found[-1] + int(doc_id in relevant_ids and doc_id not in retrieved_ids))
+        retrieved_ids.add(doc_id)
 
-    return {str(self.name): len(relevant_ids & retrieved_ids) / len(relevant_ids) if len(relevant_ids) > 0 else 0}
+    metrics = {}
+    for name, at in zip(self.names, self.cutoffs):
+        if len(relevant_ids) == 0:
+            metrics[name] = 0
+        elif missing_id_position is not None and missing_id_position < at:
+            metrics[name] = 0 / len(relevant_ids)
+        else:
+            metrics[name] = found[min(at, len(found) - 1)] / len(relevant_ids)
+    return metrics
 
-# %% ../002_module_evaluation.ipynb 61
+# %% ../002_module_evaluation.ipynb 71
 class ReciprocalRank(EvalMetric):
     def __init__(
         self, 
-        at: int  # Maximum position on the resulting list to look for relevant docs.
+        at: Union[int, List[int]]  # Maximum position on the resulting list to look for relevant docs. Use a list to compute the metric at many positions from a single pass over the hits.
     ):
         "Compute the reciprocal rank at position `at`"
         super().__init__()
-        self.name = "reciprocal_rank_" + str(at)
-        self.at = at
+        self.cutoffs = _cutoffs(at)
+        self.names = ["reciprocal_rank_" + str(x) for x in self.cutoffs]
+        self.name = "reciprocal_rank_" + "_".join([str(x) for x in self.cutoffs])
+        self.at = max(self.cutoffs)
 
-# %% ../002_module_evaluation.ipynb 64
+# %% ../002_module_evaluation.ipynb 74
 @patch
 def evaluate_query(
     self: ReciprocalRank,
@@ -172,34 +346,43 @@ def evaluate_query(
     """
 
     relevant_ids = {str(doc["id"]) for doc in relevant_docs if doc.get("score", default_score) > 0}
-    rr = 0
-    hits = query_results.hits[: self.at]
-    for index, hit in enumerate(hits):
+    first_relevant_position = None
+    for index, hit in enumerate(query_results.hits[: self.at]):
         try:
             if str(hit["fields"][id_field]) in relevant_ids:
-                rr = 1 / (index + 1)
+                first_relevant_position = index
                 break
         except KeyError:
-            rr = 0
+            continue
 
-    return {str(self.name): rr}
+    return {
+        name: 1 / (first_relevant_position + 1) 
+        if first_relevant_position is not None and first_relevant_position < at else 0 
+        for name, at in zip(self.names, self.cutoffs)
+    }
 
-# %% ../002_module_evaluation.ipynb 75
+# %% ../002_module_evaluation.ipynb 85
 class NormalizedDiscountedCumulativeGain(EvalMetric):
     def __init__(
         self, 
-        at: int  # Maximum position on the resulting list to look for relevant docs.
+        at: Union[int, List[int]]  # Maximum position on the resulting list to look for relevant docs. Use a list to compute the metric at many positions from a single pass over the hits.
     ):
         "Compute the normalized discounted cumulative gain at position `at`."
         super().__init__()
-        self.name = "ndcg_" + str(at)
-        self.at = at
+        self.cutoffs = _cutoffs(at)
+        self.names = ["ndcg_" + str(x) for x in self.cutoffs]
+        self.name = "ndcg_" + "_".join([str(x) for x in self.cutoffs])
+        self.at = max(self.cutoffs)
 
     @staticmethod    
     def _compute_dcg(scores: List[int]) -> float:
         return sum([score / math.log2(idx + 2) for idx, score in enumerate(scores)])        
 
-# %% ../002_module_evaluation.ipynb 78
+    @staticmethod    
+    def _cumulative_dcg(scores: List[int]) -> List[float]:
+        return list(accumulate([score / math.log2(idx + 2) for idx, score in enumerate(scores)]))
+
+# %% ../002_module_evaluation.ipynb 88
 @patch
 def evaluate_query(
     self: NormalizedDiscountedCumulativeGain,
@@ -237,71 +420,471 @@ def evaluate_query(
     for idx, score in enumerate(sorted_score_list):
         ideal_scores[idx] = score
 
-    ideal_dcg = self._compute_dcg(ideal_scores)
-    dcg = self._compute_dcg(search_scores)
+    # cumulative gains are computed once and read at every cutoff
+    ideal_dcg_curve = self._cumulative_dcg(ideal_scores)
+    dcg_curve = self._cumulative_dcg(search_scores)
 
-    ndcg = 0
-    if ideal_dcg > 0:
-        ndcg = dcg / ideal_dcg
+    metrics = {}
+    for name, cutoff in zip(self.names, self.cutoffs):
+        ideal_dcg = ideal_dcg_curve[cutoff - 1]
+        dcg = dcg_curve[cutoff - 1]
+        ndcg = 0
+        if ideal_dcg > 0:
+            ndcg = dcg / ideal_dcg
+        metrics[name] = ndcg
+        if detailed_metrics:
+            metrics.update(
+                {
+                    name + "_ideal_dcg": ideal_dcg,
+                    name + "_dcg": dcg,
+                }
+            )
+    return metrics
 
-    metrics = {
-        str(self.name): ndcg,
-    }
-    if detailed_metrics:
-        metrics.update(
-            {
-                str(self.name) + "_ideal_dcg": ideal_dcg,
-                str(self.name) + "_dcg": dcg,
-            }
+# %% ../002_module_evaluation.ipynb 104
+def _get_ranking_batch(
+    metric: EvalMetric,  # Metric with an `at` attribute.
+    query_results: List[VespaQueryResponse],  # Raw query results returned by Vespa, one per query.
+    relevant_docs: Union[List[List[Dict]], RelevanceIndex],  # Relevant docs of each query.
+    id_field: str,  # The Vespa field representing the document id.
+    default_score: int,  # Score to assign to the additional documents that are not relevant.
+    ranking_batch: Optional[RankingBatch] = None,  # Relevance matrices shared by the metrics evaluating the same batch.
+) -> RankingBatch:
+    if ranking_batch is None:
+        return RankingBatch(query_results, relevant_docs, id_field, default_score, at=metric.at)
+    assert ranking_batch.at >= metric.at, "RankingBatch must keep at least {} hits.".format(metric.at)
+    return ranking_batch
+
+# %% ../002_module_evaluation.ipynb 105
+@patch
+def evaluate_batch(
+    self: Recall,
+    query_results: List[VespaQueryResponse],  # Raw query results returned by Vespa, one per query.
+    relevant_docs: Union[List[List[Dict]], RelevanceIndex],  # Relevant docs of each query. Each dict contains a doc id a optionally a doc score.
+    id_field: str,  # The Vespa field representing the document id.
+    default_score: int,  # Score to assign to the additional documents that are not relevant. Default to 0.
+    detailed_metrics=False,  # Return intermediate computations if available.
+    ranking_batch: Optional[RankingBatch] = None,  # Relevance matrices of the batch, shared by the metrics evaluating the same batch.
+) -> Dict[str, np.ndarray]:  # Returns the recall value of each query.
+    "Evaluate a batch of query results according to recall metric."
+    batch = _get_ranking_batch(self, query_results, relevant_docs, id_field, default_score, ranking_batch)
+    found = np.cumsum(batch.relevant[:, : self.at] & batch.first[:, : self.at], axis=1)
+    n_missing = np.cumsum(batch.missing_id[:, : self.at], axis=1)
+    metrics = {}
+    for name, at in zip(self.names, self.cutoffs):
+        recall = np.divide(
+            found[:, at - 1], batch.n_relevant, out=np.zeros(found.shape[0]), where=batch.n_relevant > 0
         )
+        # a hit without the id field invalidates the retrieved set, as in `evaluate_query`
+        recall[n_missing[:, at - 1] > 0] = 0
+        metrics[name] = recall
     return metrics
 
+# %% ../002_module_evaluation.ipynb 106
+@patch
+def evaluate_batch(
+    self: ReciprocalRank,
+    query_results: List[VespaQueryResponse],  # Raw query results returned by Vespa, one per query.
+    relevant_docs: Union[List[List[Dict]], RelevanceIndex],  # Relevant docs of each query. Each dict contains a doc id a optionally a doc score.
+    id_field: str,  # The Vespa field representing the document id.
+    default_score: int,  # Score to assign to the additional documents that are not relevant. Default to 0.
+    detailed_metrics=False,  # Return intermediate computations if available.
+    ranking_batch: Optional[RankingBatch] = None,  # Relevance matrices of the batch, shared by the metrics evaluating the same batch.
+) -> Dict[str, np.ndarray]:  # Returns the reciprocal rank value of each query.
+    "Evaluate a batch of query results according to reciprocal rank metric."
+    batch = _get_ranking_batch(self, query_results, relevant_docs, id_field, default_score, ranking_batch)
+    relevant = batch.relevant[:, : self.at]
+    position = np.where(relevant.any(axis=1), relevant.argmax(axis=1), self.at)
+    return {
+        name: np.where(position < at, 1 / (position + 1), 0) 
+        for name, at in zip(self.names, self.cutoffs)
+    }
+
+# %% ../002_module_evaluation.ipynb 107
+@patch
+def evaluate_batch(
+    self: NormalizedDiscountedCumulativeGain,
+    query_results: List[VespaQueryResponse],  # Raw query results returned by Vespa, one per query.
+    relevant_docs: Union[List[List[Dict]], RelevanceIndex],  # Relevant docs of each query. Each dict contains a doc id a optionally a doc score.
+    id_field: str,  # The Vespa field representing the document id.
+    default_score: int,  # Score to assign to the additional documents that are not relevant. Default to 0.
+    detailed_metrics=False,  # Return intermediate computations if available.
+    ranking_batch: Optional[RankingBatch] = None,  # Relevance matrices of the batch, shared by the metrics evaluating the same batch.
+) -> Dict[str, np.ndarray]:  # Returns the normalized discounted cumulative gain of each query. In addition, if `detailed_metrics=False`, returns the ideal discounted cumulative gain `_ideal_dcg`, the discounted cumulative gain `_dcg`.
+    "Evaluate a batch of query results according to normalized discounted cumulative gain."
+    assert default_score == 0, "NDCG default score should be zero."
+    batch = _get_ranking_batch(self, query_results, relevant_docs, id_field, default_score, ranking_batch)
+    discount = np.log2(np.arange(self.at) + 2)
+    dcg_curve = np.cumsum(batch.scores[:, : self.at] / discount, axis=1)
+    ideal_dcg_curve = np.cumsum(batch.ideal_scores[:, : self.at] / discount, axis=1)
+    metrics = {}
+    for name, at in zip(self.names, self.cutoffs):
+        dcg = dcg_curve[:, at - 1]
+        ideal_dcg = ideal_dcg_curve[:, at - 1]
+        metrics[name] = np.divide(dcg, ideal_dcg, out=np.zeros(dcg.shape[0]), where=ideal_dcg > 0)
+        if detailed_metrics:
+            metrics.update(
+                {
+                    name + "_ideal_dcg": ideal_dcg,
+                    name + "_dcg": dcg,
+                }
+            )
+    return metrics
+
+# %% ../002_module_evaluation.ipynb 119
+class RetryPolicy(object):
+    def __init__(
+        self,
+        max_retries: int = 3,  # Maximum number of retry rounds.
+        backoff: float = 0.5,  # Delay in seconds before the first retry round, doubled at every round.
+        max_backoff: float = 30.0,  # Upper bound of the delay between retry rounds, in seconds.
+        jitter: bool = True,  # Draw each delay uniformly between zero and the exponential delay.
+        deadline: Optional[float] = None,  # Seconds after the first round past which failing queries are given up. No deadline by default.
+        connections: int = 100,  # Number of concurrent connections of the first round.
+        min_connections: int = 1,  # Lower bound when shrinking the number of concurrent connections.
+        throttle_rate: float = 0.1,  # Halve the connections when the share of 429/503 responses in a round reaches this rate.
+        seed: Optional[int] = None,  # Seed of the jitter random generator.
+    ) -> None:
+        "Schedule used to resend failed queries."
+        assert max_retries >= 0, "max_retries must be a non-negative integer."
+        assert min_connections > 0, "min_connections must be a positive integer."
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.connections = max(connections, min_connections)
+        self.min_connections = min_connections
+        self.throttle_rate = throttle_rate
+        self.rng = np.random.default_rng(seed)
+
+# %% ../002_module_evaluation.ipynb 120
+@patch
+def delay(
+    self: RetryPolicy, 
+    retry: int,  # Retry round, starting at 0.
+) -> float:  # Seconds to wait before the retry round.
+    "Exponential backoff capped at `max_backoff`, drawn uniformly from zero to the cap when `jitter=True`."
+    delay = min(self.max_backoff, self.backoff * 2**retry)
+    return float(self.rng.uniform(0, delay)) if self.jitter else delay
+
+# %% ../002_module_evaluation.ipynb 121
+@patch
+def next_connections(
+    self: RetryPolicy,
+    connections: int,  # Concurrent connections used in the last round.
+    status_codes: List[int],  # Status codes of the responses of the last round.
+) -> int:  # Concurrent connections to use in the next round.
+    "Halve the concurrent connections when the share of throttled (429/503) responses reaches `throttle_rate`."
+    throttled = sum([status_code in (429, 503) for status_code in status_codes])
+    if len(status_codes) > 0 and throttled / len(status_codes) >= self.throttle_rate:
+        return max(self.min_connections, connections // 2)
+    return connections
+
+# %% ../002_module_evaluation.ipynb 123
+def _has_errors(
+    query_response: VespaQueryResponse,  # Response of the application.
+) -> bool:  # True when the result lists errors, e.g. timeouts.
+    "Check whether the response body reports errors, for bodies of any type."
+    root = query_response.json.get("root", {}) if isinstance(query_response.json, dict) else {}
+    return isinstance(root, dict) and root.get("errors", None) is not None
 
-# %% ../002_module_evaluation.ipynb 93
-def _evaluate_query_retry(app, flat_labeled_data, model, timeout, **kwargs):
-    query_responses = send_query_batch(
-        app=app,
-        query_batch = [x[0] for x in flat_labeled_data], 
-        query_model = model, 
-        **{"ranking.softtimeout.enable": "false",
-          "timeout": timeout},
-        **kwargs)
-    failed_queries = [idx for idx, x in enumerate(query_responses) if x.status_code != 200]
-    count = 0
-    while len(failed_queries) > 0:
-        query_batch = [flat_labeled_data[idx][0] for idx in failed_queries]
-        retry_query_responses = send_query_batch(
-            app=app,
-            query_batch=query_batch,
-            query_model = model, 
-            **{"ranking.softtimeout.enable": "false",
-              "timeout": timeout},           
-            **kwargs
+def _evaluate_query_retry(
+    app: Vespa,  # Connection to a Vespa application.
+    flat_labeled_data: List[Tuple],  # Tuples of query, query_id and relevant docs.
+    model: QueryModel,  # Query model used to build the requests.
+    timeout,  # Vespa query timeout in ms.
+    retry_policy: Optional[RetryPolicy] = None,  # Schedule used to resend failed queries. Default to `RetryPolicy()`.
+    cache: Optional[QueryCache] = None,  # Cache of query responses, see `QueryCache`.
+    feature_memo: Optional[QueryFeatureMemo] = None,  # Memo of query features, see `QueryFeatureMemo`.
+    session: Optional[QuerySession] = None,  # Persistent connections shared by every request, see `QuerySession`.
+    **kwargs,  # Extra keyword arguments to be included in the Vespa Query.
+) -> Tuple[List[VespaQueryResponse], Dict]:  # Query responses and failure statistics.
+    "Send the queries of a query model, resending failed queries according to `retry_policy`."
+    retry_policy = RetryPolicy() if retry_policy is None else retry_policy
+    query_kwargs = {"ranking.softtimeout.enable": "false", "timeout": timeout, **kwargs}
+    connections = retry_policy.connections
+    query_responses = [None] * len(flat_labeled_data)
+    pending = list(range(len(flat_labeled_data)))
+    retries, retried_queries, deadline_exceeded = 0, 0, False
+    start = time.monotonic()
+    while len(pending) > 0:
+        try:
+            responses = send_query_batch(
+                app=app,
+                query_batch=[flat_labeled_data[idx][0] for idx in pending],
+                query_model=model,
+                connections=connections,
+                cache=cache,
+                feature_memo=feature_memo,
+                session=session,
+                **query_kwargs
+            )
+        except Exception as e:
+            # e.g. connection errors raised for the whole batch, retried as failed queries
+            responses = [_failed_response(e) for _ in pending]
+        for idx, query_response in zip(pending, responses):
+            query_responses[idx] = query_response
+        connections = retry_policy.next_connections(connections, [x.status_code for x in responses])
+        pending = [idx for idx in pending if query_responses[idx].status_code != 200]
+        if len(pending) == 0 or retries >= retry_policy.max_retries:
+            break
+        delay = retry_policy.delay(retries)
+        if retry_policy.deadline is not None and time.monotonic() - start + delay > retry_policy.deadline:
+            deadline_exceeded = True
+            break
+        time.sleep(delay)
+        retries += 1
+        retried_queries += len(pending)
+    status_codes = {}
+    for idx in pending:
+        status_codes[query_responses[idx].status_code] = status_codes.get(query_responses[idx].status_code, 0) + 1
+    failure_stats = {
+        "queries": len(flat_labeled_data),
+        "failed": len(pending),
+        "timed_out": sum([_has_errors(x) for x in query_responses]),
+        "retry_rounds": retries,
+        "retried_queries": retried_queries,
+        "deadline_exceeded": deadline_exceeded,
+        "connections": connections,
+        "status_codes": status_codes,
+        "failed_query_ids": [flat_labeled_data[idx][1] for idx in pending],
+    }
+    return query_responses, failure_stats
+
+# %% ../002_module_evaluation.ipynb 128
+class _NarrowQueryModel(QueryModel):
+    def __init__(
+        self,
+        query_model: QueryModel,  # Query model to be wrapped.
+        id_field: str,  # The Vespa field representing the document id.
+        narrow_response: Union[bool, str] = True,  # True to select only `id_field`, or name of the document summary to request.
+    ) -> None:
+        """
+        Query model with the name of `query_model`, whose request bodies only ask for the document id.
+
+        With `narrow_response=True`, only a YQL starting with `select * from` is rewritten to select `id_field`,
+        other bodies are sent unchanged. A document summary name is added to every body.
+        """
+        super().__init__(name=query_model.name)
+        self.query_model = query_model
+        self.id_field = id_field
+        self.narrow_response = narrow_response
+
+    def narrow(self, body: Dict) -> Dict:
+        body = dict(body)
+        if isinstance(self.narrow_response, str):
+            body["presentation.summary"] = self.narrow_response
+        elif "yql" in body:
+            body["yql"] = re.sub(
+                r"^\s*select\s+\*\s+from\b", 
+                "select {} from".format(self.id_field), 
+                body["yql"], 
+                count=1, 
+                flags=re.IGNORECASE
+            )
+        return body
+
+    def create_body(self, query: str, feature_memo=None) -> Dict:
+        return self.create_body_batch(queries=[query], feature_memo=feature_memo)[0]
+
+    def create_body_batch(self, queries: List[str], feature_memo=None) -> List[Dict]:
+        return [self.narrow(body) for body in _create_body_batch(self.query_model, queries, feature_memo)]
+
+def _narrow_query_model(
+    query_model: QueryModel,  # Query model to be wrapped.
+    id_field: str,  # The Vespa field representing the document id.
+    narrow_response: Union[bool, str] = True,  # True to select only `id_field`, or name of the document summary to request.
+) -> QueryModel:  # Query model with the same name building narrowed request bodies.
+    "Wrap a query model so that its request bodies only ask for the document id."
+    return _NarrowQueryModel(query_model, id_field, narrow_response)
+
+# %% ../002_module_evaluation.ipynb 131
+def _labeled_data_windows(
+    labeled_data: Iterable[Dict],  # Data containing query, query_id and relevant docs.
+    chunk_size: Optional[int] = None,  # Number of queries in each window. A single window when None.
+) -> Iterator[List[Dict]]:
+    "Split labeled data into consecutive windows of at most `chunk_size` queries without materializing it."
+    if chunk_size is None:
+        yield list(labeled_data)
+        return
+    assert chunk_size > 0, "chunk_size must be a positive integer."
+    iterator = iter(labeled_data)
+    window = list(islice(iterator, chunk_size))
+    while len(window) > 0:
+        yield window
+        window = list(islice(iterator, chunk_size))
+
+def _merge_failure_stats(
+    stats: Optional[Dict],  # Failure statistics accumulated so far, None for the first window.
+    window_stats: Dict,  # Failure statistics of a window, as returned by `_evaluate_query_retry`.
+) -> Dict:  # Failure statistics of both.
+    if stats is None:
+        return window_stats
+    merged = {}
+    for key, value in window_stats.items():
+        if key == "connections":
+            merged[key] = value
+        elif key == "deadline_exceeded":
+            merged[key] = stats[key] or value
+        elif key == "status_codes":
+            merged[key] = dict(stats[key])
+            for status_code, count in value.items():
+                merged[key][status_code] = merged[key].get(status_code, 0) + count
+        else:
+            merged[key] = stats[key] + value
+    return merged
+
+class _EvaluationWriter(object):
+    def __init__(
+        self, 
+        path: str,  # Path of the .csv or .parquet output file. It is overwritten by the first write.
+    ) -> None:
+        "Write data frames one after another to a single .csv or .parquet file."
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self.rows = 0
+        self._started = False
+        self._parquet_writer = None
+
+    def write(self, df: DataFrame) -> None:
+        if self.parquet:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Writing .parquet files requires pyarrow. Install it with 'pip install pyarrow'.")
+            # metrics are written as float64, since a metric can be int in a window and float or NaN in the next
+            metrics = [x for x in df.columns if x not in ["model", "query_id"]]
+            table = pa.Table.from_pandas(df.astype({metric: "float64" for metric in metrics}), preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+        else:
+            df.to_csv(self.path, header=not self._started, index=False, mode="a" if self._started else "w")
+        self._started = True
+        self.rows += len(df)
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+# %% ../002_module_evaluation.ipynb 132
+_ONLINE_AGGREGATORS = ["count", "sum", "mean", "std", "var", "min", "max", "median"]
+
+def _percentile_level(
+    aggregator,  # Aggregator name such as "p90" or "p99.9".
+) -> Optional[float]:  # Quantile level, or None if the aggregator is not a percentile.
+    match = re.fullmatch(r"p(\d{1,2}(?:\.\d+)?)", aggregator) if isinstance(aggregator, str) else None
+    return float(match.group(1)) / 100 if match else None
+
+class _OnlineSummary(object):
+    def __init__(
+        self, 
+        aggregators: List[str],  # Names in `_ONLINE_AGGREGATORS` or percentiles such as "p90".
+        max_exact: int = 10000,  # Number of values per metric up to which medians and percentiles are exact, see `QuantileSketch`.
+    ) -> None:
+        "Aggregate metrics per query model incrementally, without keeping the metrics of each query."
+        self.aggregators = aggregators
+        self.max_exact = max_exact
+        self.use_sketch = any([x == "median" or _percentile_level(x) is not None for x in aggregators])
+        self.metrics = None
+        self.moments = {}  # model -> metric -> RunningMoments
+        self.sketches = {}  # model -> metric -> QuantileSketch
+
+    @staticmethod
+    def supports(aggregators) -> bool:
+        return all([x in _ONLINE_AGGREGATORS or _percentile_level(x) is not None for x in aggregators])
+
+    def update(
+        self, 
+        model: str,  # Query model name.
+        evaluation: Dict,  # Metric values of a batch of queries, plus the model and query_id entries.
+    ) -> None:
+        if self.metrics is None:
+            self.metrics = [x for x in evaluation if x not in ["model", "query_id"]]
+        moments = self.moments.setdefault(model, {metric: RunningMoments() for metric in self.metrics})
+        sketches = self.sketches.setdefault(model, {metric: QuantileSketch(max_exact=self.max_exact) for metric in self.metrics})
+        for metric in self.metrics:
+            values = np.asarray(evaluation[metric], dtype=float)
+            moments[metric].update(values)
+            if self.use_sketch:
+                sketches[metric].update(values)
+
+    def _aggregate(self, model: str, metric: str, aggregator: str) -> float:
+        moments = self.moments[model][metric]
+        if aggregator == "median":
+            return self.sketches[model][metric].quantile(0.5)
+        if aggregator in ["std", "var"]:
+            return getattr(moments, aggregator)()
+        if aggregator == "mean":
+            return moments.mean if moments.count > 0 else np.nan
+        if aggregator in ["count", "sum", "min", "max"]:
+            return getattr(moments, aggregator)
+        return self.sketches[model][metric].quantile(_percentile_level(aggregator))
+
+    def summary(self) -> DataFrame:  # Same layout and dtypes as `groupby("model").agg(aggregators).T`.
+        models = Index(sorted(self.moments), name="model")
+        metrics = self.metrics if self.metrics is not None else []
+        index = [(metric, aggregator) for metric in metrics for aggregator in self.aggregators]
+        # counts are integers, as in pandas, until the transpose mixes them with float aggregators
+        aggregated = DataFrame(
+            {
+                (metric, aggregator): Series(
+                    [self._aggregate(model, metric, aggregator) for model in models], 
+                    index=models, 
+                    dtype="int64" if aggregator == "count" else float,
+                )
+                for metric, aggregator in index
+            },
+            index=models,
         )
-        for idx, query_response_idx in enumerate(failed_queries):
-            query_responses[query_response_idx] = retry_query_responses[idx]
-        failed_queries = [idx for idx, x in enumerate(query_responses) if x.status_code != 200]
-        count+=1
-        if count>=3: break   
-    return query_responses
-    
+        return aggregated.T
+
+# %% ../002_module_evaluation.ipynb 134
 def evaluate(
     app: Vespa,  # Connection to a Vespa application.
-    labeled_data: Union[List[Dict], DataFrame],  # Data containing query, query_id and relevant docs. See examples below for format.
+    labeled_data: Union[Iterable[Dict], DataFrame, LabeledData],  # Data containing query, query_id and relevant docs. See examples below for format.
     eval_metrics: List[EvalMetric],  # Evaluation metrics
     query_model: Union[QueryModel, List[QueryModel]],  # Query models to be evaluated
     id_field: str,  # The Vespa field representing the document id.
     default_score: int = 0,  # Score to assign to the additional documents that are not relevant.
     detailed_metrics=False,  # Return intermediate computations if available. 
     per_query=False,  # Set to True to return evaluation metrics per query.
-    aggregators=None,  # Used only if `per_query=False`. List of pandas friendly aggregators to summarize per model metrics. We use ["mean", "median", "std"] by default.
+    aggregators=None,  # Used only if `per_query=False`. List of pandas friendly aggregators to summarize per model metrics. We use ["mean", "median", "std"] by default. Percentiles such as "p90" are also accepted.
     timeout=1000,  # Vespa query timeout in ms.
+    retry_policy: Optional[RetryPolicy] = None,  # Schedule used to resend failed queries. Default to `RetryPolicy()`.
+    cache: Optional[QueryCache] = None,  # Cache of query responses. Cached responses are not sent again to the app.
+    narrow_response: Union[bool, str] = False,  # True to request only `id_field`, by rewriting a YQL that starts with `select * from`, and the hits needed by the metrics. Use a str to request a document summary with that name instead, whatever the YQL.
+    chunk_size: Optional[int] = None,  # Number of queries sent and scored at a time. All the queries at once when None.
+    output_file_path: Optional[str] = None,  # Path of a .csv or .parquet file receiving the metrics per query as each chunk is scored.
+    feature_memo: Optional[QueryFeatureMemo] = None,  # Memo of query features shared across calls. Each chunk of queries uses a new memo shared by the query models when None.
+    session: Optional[QuerySession] = None,  # Persistent connections shared by every request, including retries, see `QuerySession`. Required to measure the client time of `Latency`.
+    max_exact: int = 10000,  # Number of queries per model up to which the online medians and percentiles are exact.
     **kwargs,  # Extra keyword arguments to be included in the Vespa Query.
-) -> DataFrame:  # Returns query_id and metrics according to the selected evaluation metrics.
-    "Evaluate a `QueryModel` according to a list of `EvalMetric`."
+) -> Optional[DataFrame]:  # Returns query_id and metrics according to the selected evaluation metrics. None if `per_query=True` and `output_file_path` is set.
+    """
+    Evaluate a `QueryModel` according to a list of `EvalMetric`.
+
+    Failure statistics of each query model, as returned by the retries scheduled by `retry_policy`, are available 
+    in the `query_failures` entry of the `attrs` of the returned data frame.
+
+    With `per_query=False`, the aggregators "count", "sum", "mean", "std", "var", "min", "max", "median" and 
+    percentiles such as "p90" are updated as each batch of queries is scored, without keeping the metrics of every 
+    query. Medians and percentiles are exact up to `max_exact` queries per model, and approximated by a 
+    `QuantileSketch` above. Other aggregators are computed by pandas from the metrics of every query.
+
+    Query features computed by `QueryRankingFeature` and `BatchQueryRankingFeature` are memoized by mapping and query, 
+    so that query models sharing a mapping, e.g. the same embedding model, compute it once for each query.
+
+    When `eval_metrics` contains a `Latency` metric, queries ask for `presentation.timing` and the server and client 
+    times of each query model are also recorded into `LatencyHistogram`s, available in the `latency_histograms` entry 
+    of the `attrs` of the returned data frame. `app.query_batch` does not time requests one by one, so the client time 
+    is NaN unless a `session` is given, whose requests are timed. The transport is never changed for the metric.
+    """
     
     if isinstance(labeled_data, DataFrame):
-        labeled_data = _parse_labeled_data(df=labeled_data)
+        labeled_data = LabeledData.from_df(labeled_data)
 
     if isinstance(query_model, QueryModel):
         query_model = [query_model]
@@ -311,44 +894,200 @@ def evaluate(
         set(model_names)
     ), "Duplicate model names. Choose unique model names."
 
-    evaluation = []
-
-    for model in query_model:
-        flat_labeled_data = [(x["query"], x["query_id"], x["relevant_docs"]) for x in labeled_data]
-        query_responses = _evaluate_query_retry(app, flat_labeled_data, model, timeout, **kwargs)
-        failed_queries = [idx for idx, x in enumerate(query_responses) if x.status_code != 200]
-        if len(failed_queries) > 0:
-            print(f"Failed queries for query model {model.name}: {len(failed_queries)}/{len(query_responses)}")
-        timedout_queries = [idx for idx, x in enumerate(query_responses) if x.json.get("root", {}).get("errors", None) is not None]
-        if len(timedout_queries) > 0:
-            print(f"Timeout queries for query model {model.name}: {len(timedout_queries)}/{len(query_responses)}")
-            
-        for ((query, query_id, relevant_docs), query_response) in zip(flat_labeled_data, query_responses):
-            evaluation_query = {"model": model.name, "query_id": query_id}
-            for evaluator in eval_metrics:
-                evaluation_query.update(
-                    evaluator.evaluate_query(
-                        query_response,
-                        relevant_docs,
-                        id_field,
-                        default_score,
-                        detailed_metrics,
-                    )
+    # metrics with a vectorized implementation share the relevance matrices of each batch
+    max_at = max([getattr(evaluator, "at", 0) for evaluator in eval_metrics], default=0)
+    if narrow_response and max_at > 0:
+        # without cutoffs the metrics read every hit, so the hits of the query model are kept
+        kwargs = {"hits": max_at, **kwargs}
+    if not per_query and not aggregators:
+        aggregators = ["mean", "median", "std"]
+    online_summary = _OnlineSummary(aggregators, max_exact=max_exact) if not per_query and _OnlineSummary.supports(aggregators) else None
+    writer = None if output_file_path is None else _EvaluationWriter(output_file_path)
+    latency_metrics = [evaluator for evaluator in eval_metrics if isinstance(evaluator, Latency)]
+    latency_histograms = {
+        model.name: {"server_time": LatencyHistogram(), "client_time": LatencyHistogram()} for model in query_model
+    } if len(latency_metrics) > 0 else None
+    if latency_histograms is not None:
+        kwargs = {"presentation.timing": True, **kwargs}
+    evaluation = {model.name: [] for model in query_model}
+    query_failures = {model.name: None for model in query_model}
+    try:
+        for window in _labeled_data_windows(labeled_data, chunk_size):
+            flat_labeled_data = [(x["query"], x["query_id"], x["relevant_docs"]) for x in window]
+            relevant_docs = [x[2] for x in flat_labeled_data]
+            # relevance judgments are compiled once and shared by every query model and metric
+            relevance_index = RelevanceIndex(relevant_docs, default_score)
+            # each query model may map the queries of the window with its own query features
+            window_memo = (
+                QueryFeatureMemo(max_items=max(1, len(window) * len(query_model))) if feature_memo is None else feature_memo
+            )
+            for model in query_model:
+                request_model = _narrow_query_model(model, id_field, narrow_response) if narrow_response else model
+                query_responses, window_failures = _evaluate_query_retry(
+                    app, flat_labeled_data, request_model, timeout, retry_policy, cache, window_memo, session, **kwargs
                 )
-            evaluation.append(evaluation_query)
-    evaluation = DataFrame.from_records(evaluation)
+                query_failures[model.name] = _merge_failure_stats(query_failures[model.name], window_failures)
+
+                ranking_batch = RankingBatch(query_responses, relevance_index, id_field, default_score, at=max_at)
+                evaluation_model = {
+                    "model": [model.name] * len(flat_labeled_data), 
+                    "query_id": [x[1] for x in flat_labeled_data]
+                }
+                for evaluator in eval_metrics:
+                    evaluation_model.update(
+                        evaluator.evaluate_batch(
+                            query_responses,
+                            relevant_docs,
+                            id_field,
+                            default_score,
+                            detailed_metrics,
+                            ranking_batch=ranking_batch,
+                        )
+                    )
+                # responses of the window are released before the next window is sent
+                del query_responses, ranking_batch
+                if latency_histograms is not None:
+                    for time_name, histogram in latency_histograms[model.name].items():
+                        histogram.record(evaluation_model[latency_metrics[0].name + "_" + time_name])
+                if writer is not None:
+                    writer.write(DataFrame(evaluation_model))
+                if online_summary is not None:
+                    online_summary.update(model.name, evaluation_model)
+                elif writer is None or not per_query:
+                    evaluation[model.name].append(DataFrame(evaluation_model))
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None and per_query:
+        return None
+    if online_summary is not None:
+        evaluation = online_summary.summary()
+        evaluation.attrs["query_failures"] = query_failures
+        if latency_histograms is not None:
+            evaluation.attrs["latency_histograms"] = latency_histograms
+        return evaluation
+    evaluation = [df for model in query_model for df in evaluation[model.name]]
+    evaluation = concat(evaluation, ignore_index=True) if len(evaluation) > 0 else DataFrame(columns=["model", "query_id"])
     if not per_query:
-        if not aggregators:
-            aggregators = ["mean", "median", "std"]
         evaluation = (
             evaluation[[x for x in evaluation.columns if x != "query_id"]]
             .groupby(by="model")
             .agg(aggregators)
             .T
         )
+    evaluation.attrs["query_failures"] = query_failures
+    if latency_histograms is not None:
+        evaluation.attrs["latency_histograms"] = latency_histograms
     return evaluation
 
-# %% ../002_module_evaluation.ipynb 131
+# %% ../002_module_evaluation.ipynb 190
+async def evaluate_async(
+    app: Vespa,  # Connection to a Vespa application.
+    labeled_data: Union[List[Dict], DataFrame, LabeledData],  # Data containing query, query_id and relevant docs. See `evaluate` for format.
+    eval_metrics: List[EvalMetric],  # Evaluation metrics
+    query_model: Union[QueryModel, List[QueryModel]],  # Query models to be evaluated
+    id_field: str,  # The Vespa field representing the document id.
+    default_score: int = 0,  # Score to assign to the additional documents that are not relevant.
+    detailed_metrics=False,  # Return intermediate computations if available.
+    concurrency: int = 100,  # Maximum number of queries in flight, shared by all query models.
+    timeout=1000,  # Vespa query timeout in ms.
+    cache: Optional[QueryCache] = None,  # Cache of query responses. Cached responses are not sent again to the app.
+    narrow_response: Union[bool, str] = False,  # True to request only `id_field`, by rewriting a YQL that starts with `select * from`, and the hits needed by the metrics. Use a str to request a document summary with that name instead, whatever the YQL.
+    feature_memo: Optional[QueryFeatureMemo] = None,  # Memo of query features shared by the query models, see `QueryFeatureMemo`. A new memo is used when None.
+    latency_histograms: Optional[Dict] = None,  # Filled with the server and client time `LatencyHistogram`s of each query model when `eval_metrics` contains a `Latency` metric.
+    **kwargs,  # Extra keyword arguments to be included in the Vespa Query.
+) -> AsyncIterator[Dict]:  # One row per query model and query with model, query_id and metrics.
+    """
+    Evaluate query models concurrently and yield the evaluation of each query as soon as its response arrives.
+
+    Queries of every query model are sent through a single async connection with at most `concurrency` 
+    requests in flight, so that waiting for Vespa overlaps with computing the metrics. Rows are yielded 
+    in completion order and responses are discarded once scored.
+
+    When `eval_metrics` contains a `Latency` metric, queries ask for `presentation.timing` and the times of each 
+    query are recorded into the histograms of `latency_histograms` as the rows are yielded.
+    """
+    if isinstance(labeled_data, DataFrame):
+        labeled_data = LabeledData.from_df(labeled_data)
+
+    if isinstance(query_model, QueryModel):
+        query_model = [query_model]
+
+    model_names = [model.name for model in query_model]
+    assert len(model_names) == len(
+        set(model_names)
+    ), "Duplicate model names. Choose unique model names."
+    assert concurrency > 0, "concurrency must be a positive integer."
+    if narrow_response:
+        max_at = max([getattr(evaluator, "at", 0) for evaluator in eval_metrics], default=0)
+        if max_at > 0:
+            kwargs = {"hits": max_at, **kwargs}
+        query_model = [_narrow_query_model(model, id_field, narrow_response) for model in query_model]
+    if feature_memo is None:
+        # interleaved query models send the same query close to each other
+        feature_memo = QueryFeatureMemo(max_items=max(concurrency, 1000))
+    latency_metrics = [evaluator for evaluator in eval_metrics if isinstance(evaluator, Latency)]
+    if len(latency_metrics) > 0:
+        kwargs = {"presentation.timing": True, **kwargs}
+        if latency_histograms is not None:
+            for model in query_model:
+                latency_histograms.setdefault(
+                    model.name, {"server_time": LatencyHistogram(), "client_time": LatencyHistogram()}
+                )
+    else:
+        latency_histograms = None
+
+    async with app.asyncio(connections=concurrency) as async_app:
+
+        async def evaluate_one(model, data):
+            body = _build_query_body(
+                data["query"], 
+                model, 
+                feature_memo=feature_memo,
+                **{"ranking.softtimeout.enable": "false", "timeout": timeout}, 
+                **kwargs
+            )
+            query_response = None if cache is None else cache.get(app, body)
+            if query_response is None:
+                start = time.perf_counter()
+                query_response = await async_app.query(body=body)
+                # round-trip time observed by the client, read by the `Latency` metric
+                query_response.client_time = time.perf_counter() - start
+                if cache is not None:
+                    cache.put(app, body, query_response)
+            else:
+                query_response.client_time = np.nan
+            row = {"model": model.name, "query_id": data["query_id"]}
+            for evaluator in eval_metrics:
+                row.update(
+                    evaluator.evaluate_query(
+                        query_response, data["relevant_docs"], id_field, default_score, detailed_metrics
+                    )
+                )
+            if latency_histograms is not None:
+                for time_name, histogram in latency_histograms[model.name].items():
+                    histogram.record(row[latency_metrics[0].name + "_" + time_name])
+            return row
+
+        # interleave query models so that all of them make progress at the same time
+        requests = ((model, data) for data in labeled_data for model in query_model)
+        pending = set()
+        try:
+            for model, data in requests:
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+                pending.add(asyncio.ensure_future(evaluate_one(model, data)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+# %% ../002_module_evaluation.ipynb 204
 def evaluate_query(
     app: Vespa,  # Connection to a Vespa application.
     eval_metrics: List[EvalMetric],  # Evaluation metrics
@@ -21,7 +21,7 @@ from vespa.package import (
     RankProfile, 
     QueryField
 )
-from .query import QueryModel
+from .query import QueryModel, LabeledData
 from vespa.deployment import VespaDocker
 from .evaluation import EvalMetric, evaluate
 from .stats import compute_evaluation_estimates
@@ -189,8 +189,9 @@ def get_queries(
 @patch
 def get_labels(
     self: PassageData, 
-    type: str  # Either 'train' or 'dev'.
-) -> Dict:  # pyvespa-formatted labeled data 
+    type: str,  # Either 'train' or 'dev'.
+    columnar: bool = False,  # Return a `LabeledData` instead of a list of dict.
+) -> Dict:  # pyvespa-formatted labeled data, a `LabeledData` when `columnar=True`.
     "Get labeled data"
     assert type in ['train', 'dev'], "'type' should be either 'train' or 'dev'."
     if type == 'train':
@@ -199,6 +200,13 @@ def get_labels(
     elif type == 'dev':
         queries = self.dev_queries
         qrels = self.dev_qrels        
+    if columnar:
+        doc_ids, scores, offsets = [], [], [0]
+        for query_id in queries:
+            doc_ids.extend(qrels[query_id].keys())
+            scores.extend(qrels[query_id].values())
+            offsets.append(len(doc_ids))
+        return LabeledData(list(queries.keys()), list(queries.values()), doc_ids, scores, offsets)
     return [
         {
             "query_id": query_id, 
@@ -208,7 +216,7 @@ def get_labels(
         for query_id, query in queries.items()
     ]
 
-# %% ../01_module_passage.ipynb 62
+# %% ../01_module_passage.ipynb 63
 def sample_data(
     n_relevant: int,  # The number of relevant documents to sample.
     n_irrelevant: int,  # The number of non-judged documents to sample. 
@@ -273,7 +281,7 @@ def sample_data(
     )
 
 
-# %% ../01_module_passage.ipynb 80
+# %% ../01_module_passage.ipynb 81
 def create_basic_search_package(
     name: str="PassageRanking"  # Name of the application
 ) -> ApplicationPackage: # pyvespa [ApplicationPackage](https://pyvespa.readthedocs.io/en/latest/reference-api.html#applicationpackage) instance.
@@ -317,7 +325,7 @@ def create_basic_search_package(
     )
     return app_package
 
-# %% ../01_module_passage.ipynb 86
+# %% ../01_module_passage.ipynb 87
 def evaluate_query_models(
     app_package: ApplicationPackage, 
     query_models: List[QueryModel],
@@ -326,6 +334,7 @@ def evaluate_query_models(
     output_file_path: str,
     dev_query_percentage: float = 55578/8841823,
     verbose: bool = True,
+    n_jobs: int = 1,
     **kwargs
 ):
 
@@ -369,7 +378,8 @@ def evaluate_query_models(
             **kwargs
         )    
         estimates = compute_evaluation_estimates(
-            df = evaluation_per_query
+            df = evaluation_per_query, 
+            n_jobs = n_jobs
         )    
         estimates = estimates.assign(corpus_size=n, number_queries=len(labeled_data))
         if idx == 0:
@@ -1,16 +1,27 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../003_module_query.ipynb.
 
 # %% auto 0
-__all__ = ['MatchFilter', 'AND', 'OR', 'WeakAnd', 'Tokenize', 'ANN', 'Union', 'Ranking', 'QueryProperty', 'QueryRankingFeature',
-           'QueryModel', 'send_query', 'send_query_batch', 'collect_vespa_features', 'store_vespa_features']
+__all__ = ['MatchFilter', 'AND', 'OR', 'WeakAnd', 'Tokenize', 'ANN', 'Union', 'Ranking', 'QueryProperty', 'QueryFeatureMemo',
+           'QueryRankingFeature', 'BatchQueryRankingFeature', 'QueryModel', 'QuerySession', 'send_query', 'QueryCache',
+           'send_query_batch', 'LabeledData', 'collect_vespa_features', 'store_vespa_features', 'read_vespa_features',
+           'LoadSchedule', 'load_test_async', 'load_test']
 
 # %% ../003_module_query.ipynb 4
+import asyncio
+import hashlib
+import json
 import os
-from typing import Optional, Dict, Callable, List, Tuple, Union
-from pandas import DataFrame
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from typing import Optional, Dict, Callable, Iterable, Iterator, List, Tuple, Union
+from pandas import DataFrame, Index, concat, read_feather, read_parquet
+from pandas.api.types import is_numeric_dtype
 from fastcore.utils import patch
 from vespa.io import VespaQueryResponse
-from vespa.application import Vespa
+from vespa.application import Vespa, VespaAsync
+from tenacity import stop_after_attempt
 
 # %% ../003_module_query.ipynb 6
 class MatchFilter(object):
@@ -37,21 +48,39 @@ def get_query_properties(
     raise NotImplementedError
 
 # %% ../003_module_query.ipynb 9
+def _escape_query(
+    query: str  # Query input.
+) -> str:  # Query input that can be placed inside a YQL string.
+    return query.replace("\\", "\\\\").replace('"', '\\"')
+
+@patch
+def match_filter_template(
+    self: MatchFilter
+) -> Optional[List[str]]:  # Parts of the YQL expression to be joined by the escaped query, or None if the filter can not be precompiled.
+    """
+    Parts of the YQL expression related to the filter that do not depend on the query. 
+
+    Filters returning a template must have query properties that do not depend on the query. 
+    `QueryModel` uses the template to create the request body without calling `create_match_filter` for every query.
+    """
+    return None
+
+# %% ../003_module_query.ipynb 10
 class AND(MatchFilter):
     def __init__(self) -> None:
         "Filter that match document containing all the query terms."
         super().__init__()
 
-# %% ../003_module_query.ipynb 12
+# %% ../003_module_query.ipynb 13
 @patch
 def create_match_filter(
     self: AND, 
     query: str  # Query input.  
 ) -> str:  # Part of the YQL expression related to the AND filter.
     "Creates part of the YQL expression related to the AND filter"
-    return '(userInput("{}"))'.format(query)
+    return _escape_query(query).join(self.match_filter_template())
 
-# %% ../003_module_query.ipynb 13
+# %% ../003_module_query.ipynb 14
 @patch
 def get_query_properties(
     self: AND, 
@@ -62,21 +91,29 @@ def get_query_properties(
 
 
 # %% ../003_module_query.ipynb 15
+@patch
+def match_filter_template(
+    self: AND
+) -> List[str]:  # Parts of the YQL expression related to the AND filter, to be joined by the query.
+    "Parts of the YQL expression related to the AND filter that do not depend on the query."
+    return ['(userInput("', '"))']
+
+# %% ../003_module_query.ipynb 17
 class OR(MatchFilter):
     def __init__(self) -> None:
         "Filter that match any document containing at least one query term."
         super().__init__()
 
-# %% ../003_module_query.ipynb 18
+# %% ../003_module_query.ipynb 20
 @patch
 def create_match_filter(
     self: OR, 
     query: str  # Query input.
 ) -> str:  # Part of the YQL expression related to the OR filter.
     "Creates part of the YQL expression related to the OR filter"    
-    return '({{grammar: "any"}}userInput("{}"))'.format(query)
+    return _escape_query(query).join(self.match_filter_template())
 
-# %% ../003_module_query.ipynb 19
+# %% ../003_module_query.ipynb 21
 @patch
 def get_query_properties(
     self: OR, 
@@ -85,7 +122,15 @@ def get_query_properties(
     "Get the relevant request properties associated with the OR filter."    
     return {}
 
-# %% ../003_module_query.ipynb 21
+# %% ../003_module_query.ipynb 22
+@patch
+def match_filter_template(
+    self: OR
+) -> List[str]:  # Parts of the YQL expression related to the OR filter, to be joined by the query.
+    "Parts of the YQL expression related to the OR filter that do not depend on the query."
+    return ['({grammar: "any"}userInput("', '"))']
+
+# %% ../003_module_query.ipynb 24
 class WeakAnd(MatchFilter):
     def __init__(
         self, 
@@ -101,17 +146,17 @@ class WeakAnd(MatchFilter):
         self.hits = hits
         self.field = field
 
-# %% ../003_module_query.ipynb 24
+# %% ../003_module_query.ipynb 27
 @patch
 def create_match_filter(
     self: WeakAnd, 
     query: str  # Query input.
 ) -> str:  # Part of the YQL expression related to the WeakAnd filter.
     "Creates part of the YQL expression related to the WeakAnd filter"
-    return '({{grammar: "weakAnd", targetHits: {}, defaultIndex: "{}"}}userInput("{}"))'.format(self.hits, self.field, query)
+    return _escape_query(query).join(self.match_filter_template())
 
 
-# %% ../003_module_query.ipynb 25
+# %% ../003_module_query.ipynb 28
 @patch
 def get_query_properties(
     self: WeakAnd, 
@@ -120,7 +165,18 @@ def get_query_properties(
     "Get the relevant request properties associated with the WeakAnd filter."        
     return {}
 
-# %% ../003_module_query.ipynb 27
+# %% ../003_module_query.ipynb 29
+@patch
+def match_filter_template(
+    self: WeakAnd
+) -> List[str]:  # Parts of the YQL expression related to the WeakAnd filter, to be joined by the query.
+    "Parts of the YQL expression related to the WeakAnd filter that do not depend on the query."
+    return [
+        '({{grammar: "weakAnd", targetHits: {}, defaultIndex: "{}"}}userInput("'.format(self.hits, self.field), 
+        '"))'
+    ]
+
+# %% ../003_module_query.ipynb 31
 class Tokenize(MatchFilter):
     def __init__(
         self, 
@@ -136,16 +192,16 @@ class Tokenize(MatchFilter):
         self.hits = hits
         self.field = field
 
-# %% ../003_module_query.ipynb 30
+# %% ../003_module_query.ipynb 34
 @patch
 def create_match_filter(
     self: Tokenize, 
     query: str  # Query input.
 ) -> str:  # Part of the YQL expression related to the Tokenizer filter.
     "Creates part of the YQL expression related to the Tokenizer filter"
-    return '({{grammar: "tokenize", targetHits: {}, defaultIndex: "{}"}}userInput("{}"))'.format(self.hits, self.field, query)
+    return _escape_query(query).join(self.match_filter_template())
 
-# %% ../003_module_query.ipynb 31
+# %% ../003_module_query.ipynb 35
 @patch
 def get_query_properties(
     self: Tokenize, 
@@ -154,7 +210,18 @@ def get_query_properties(
     "Get the relevant request properties associated with the Tokenize filter."        
     return {}
 
-# %% ../003_module_query.ipynb 33
+# %% ../003_module_query.ipynb 36
+@patch
+def match_filter_template(
+    self: Tokenize
+) -> List[str]:  # Parts of the YQL expression related to the Tokenize filter, to be joined by the query.
+    "Parts of the YQL expression related to the Tokenize filter that do not depend on the query."
+    return [
+        '({{grammar: "tokenize", targetHits: {}, defaultIndex: "{}"}}userInput("'.format(self.hits, self.field), 
+        '"))'
+    ]
+
+# %% ../003_module_query.ipynb 38
 class ANN(MatchFilter):
     def __init__(
         self,
@@ -177,7 +244,7 @@ class ANN(MatchFilter):
         self.approximate = approximate
         self._approximate = "true" if self.approximate is True else "false"
 
-# %% ../003_module_query.ipynb 39
+# %% ../003_module_query.ipynb 44
 @patch
 def create_match_filter(
     self: ANN, 
@@ -188,7 +255,7 @@ def create_match_filter(
         self.hits, self.label, self._approximate, self.doc_vector, self.query_vector
     )
 
-# %% ../003_module_query.ipynb 40
+# %% ../003_module_query.ipynb 45
 @patch
 def get_query_properties(
     self: ANN, 
@@ -197,7 +264,15 @@ def get_query_properties(
     "Get the relevant request properties associated with the ANN filter."            
     return {}
 
-# %% ../003_module_query.ipynb 43
+# %% ../003_module_query.ipynb 46
+@patch
+def match_filter_template(
+    self: ANN
+) -> List[str]:  # The YQL expression related to the ANN filter, which does not depend on the query.
+    "Parts of the YQL expression related to the ANN filter that do not depend on the query."
+    return [self.create_match_filter(query=None)]
+
+# %% ../003_module_query.ipynb 49
 class Union(MatchFilter):
     def __init__(
         self, 
@@ -207,7 +282,7 @@ class Union(MatchFilter):
         super().__init__()
         self.operators = args
 
-# %% ../003_module_query.ipynb 46
+# %% ../003_module_query.ipynb 52
 @patch
 def create_match_filter(
     self: Union, 
@@ -221,7 +296,7 @@ def create_match_filter(
             match_filters.append(match_filter)
     return " or ".join(match_filters)
 
-# %% ../003_module_query.ipynb 47
+# %% ../003_module_query.ipynb 53
 @patch
 def get_query_properties(
     self: Union,  # Query input. 
@@ -232,7 +307,25 @@ def get_query_properties(
         query_properties.update(operator.get_query_properties(query=query))
     return query_properties
 
-# %% ../003_module_query.ipynb 50
+# %% ../003_module_query.ipynb 54
+@patch
+def match_filter_template(
+    self: Union
+) -> Optional[List[str]]:  # Parts of the YQL expression related to the Union filter, or None if an operator can not be precompiled.
+    "Join the templates of the operators, so that the union is not traversed for every query."
+    parts = None
+    for operator in self.operators:
+        operator_parts = operator.match_filter_template()
+        if operator_parts is None:
+            return None
+        if parts is None:
+            parts = list(operator_parts)
+        else:
+            parts[-1] = parts[-1] + " or " + operator_parts[0]
+            parts.extend(operator_parts[1:])
+    return parts if parts is not None else [""]
+
+# %% ../003_module_query.ipynb 57
 class Ranking(object):
     def __init__(
         self, 
@@ -245,13 +338,13 @@ class Ranking(object):
         if list_features:
             self.list_features = "true"
 
-# %% ../003_module_query.ipynb 55
+# %% ../003_module_query.ipynb 62
 class QueryProperty(object):
     def __init__(self) -> None:    
         "Abstract class for query property."
         pass    
 
-# %% ../003_module_query.ipynb 56
+# %% ../003_module_query.ipynb 63
 @patch
 def get_query_properties(
     self: QueryProperty, 
@@ -261,7 +354,66 @@ def get_query_properties(
     raise NotImplementedError
 
 
-# %% ../003_module_query.ipynb 57
+# %% ../003_module_query.ipynb 64
+@patch
+def get_batch_query_properties(
+    self: QueryProperty, 
+    queries: List[str],  # Query inputs.
+    feature_memo: Optional["QueryFeatureMemo"] = None,  # Memo of query features shared by query properties, see `QueryFeatureMemo`.
+) -> List[Dict]:  # Relevant request properties of each query.
+    "Extract query property syntax for a batch of queries. Override it to process the batch with a single call."
+    return [self.get_query_properties(query=query) for query in queries]
+
+# %% ../003_module_query.ipynb 65
+class QueryFeatureMemo(object):
+    def __init__(
+        self,
+        max_items: int = 100000,  # Maximum number of query features kept.
+    ) -> None:
+        """
+        Least recently used memo of serialized query features, keyed by mapping and query.
+
+        Query properties sharing the same mapping, e.g. the same embedding model used by query models with 
+        different rank profiles, compute the features of each distinct query once. `evaluate` shares a memo 
+        across its query models. Pass the same memo to several calls to reuse the features across calls.
+        """
+        assert max_items > 0, "max_items must be a positive integer."
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()  # (mapping, query) -> serialized feature, least recently used first
+
+# %% ../003_module_query.ipynb 66
+@patch
+def map(
+    self: QueryFeatureMemo,
+    mapping: Callable,  # Mapping identifying the feature. Equal mappings share their values.
+    queries: List[str],  # Query inputs.
+    compute: Callable[[List[str]], List[str]],  # Function computing the serialized feature of a list of distinct queries.
+) -> List[str]:  # Serialized feature of each query.
+    "Serialized feature of each query, calling `compute` once with the distinct queries missing from the memo."
+    values = [None] * len(queries)
+    missing = OrderedDict()  # query -> positions in queries
+    for idx, query in enumerate(queries):
+        key = (mapping, query)
+        if key in self._values:
+            self._values.move_to_end(key)
+            values[idx] = self._values[key]
+            self.hits += 1
+        else:
+            missing.setdefault(query, []).append(idx)
+    if len(missing) > 0:
+        self.misses += len(missing)
+        for (query, positions), value in zip(missing.items(), compute(list(missing))):
+            for idx in positions:
+                values[idx] = value
+            self._values[(mapping, query)] = value
+            self._values.move_to_end((mapping, query))
+        while len(self._values) > self.max_items:
+            self._values.popitem(last=False)
+    return values
+
+# %% ../003_module_query.ipynb 67
 class QueryRankingFeature(QueryProperty):
     def __init__(
         self,
@@ -273,7 +425,7 @@ class QueryRankingFeature(QueryProperty):
         self.name = name
         self.mapping = mapping
 
-# %% ../003_module_query.ipynb 60
+# %% ../003_module_query.ipynb 70
 @patch
 def get_query_properties(
     self: QueryRankingFeature, 
@@ -282,7 +434,77 @@ def get_query_properties(
     value = self.mapping(query)
     return {"ranking.features.query({})".format(self.name): str(value)}
 
-# %% ../003_module_query.ipynb 63
+# %% ../003_module_query.ipynb 71
+@patch
+def get_batch_query_properties(
+    self: QueryRankingFeature, 
+    queries: List[str],  # Query inputs.
+    feature_memo: Optional[QueryFeatureMemo] = None,  # Memo of query features shared by query properties, see `QueryFeatureMemo`.
+) -> List[Dict[str, str]]:  # Relevant request properties of each query.
+    "Map each query, looking up `feature_memo` first when available."
+    key = "ranking.features.query({})".format(self.name)
+    compute = lambda queries: [str(self.mapping(query)) for query in queries]
+    values = compute(queries) if feature_memo is None else feature_memo.map(self.mapping, queries, compute)
+    return [{key: value} for value in values]
+
+# %% ../003_module_query.ipynb 73
+def _serialize_query_features(
+    values,  # One row of numbers per query, e.g. a 2D array or a list of lists.
+) -> List[str]:  # Tensor literal of each row.
+    "Serialize rows of numbers into tensor literals with a single conversion of arrays."
+    if isinstance(values, np.ndarray):
+        rows = values.tolist()
+    else:
+        rows = [row if isinstance(row, list) else np.asarray(row).tolist() for row in values]
+    return [json.dumps(row) for row in rows]
+
+# %% ../003_module_query.ipynb 74
+class BatchQueryRankingFeature(QueryProperty):
+    def __init__(
+        self,
+        name: str,  # Name of the feature.
+        batch_mapping: Callable[[List[str]], List[List[float]]],  # Function mapping a list of strings to one list of floats per string, e.g. a 2D array.
+        batch_size: int = 256,  # Maximum number of queries given to `batch_mapping` at once.
+    ) -> None:
+        """
+        Include ranking.feature.query into a Vespa query, mapping batches of queries at once.
+
+        Useful when the mapping is an embedding model, so that `send_query_batch` and `evaluate` 
+        compute the embeddings of `batch_size` queries with a single call.
+        """
+        super().__init__()
+        assert batch_size > 0, "batch_size must be a positive integer."
+        self.name = name
+        self.batch_mapping = batch_mapping
+        self.batch_size = batch_size
+
+# %% ../003_module_query.ipynb 77
+@patch
+def get_batch_query_properties(
+    self: BatchQueryRankingFeature, 
+    queries: List[str],  # Query inputs.
+    feature_memo: Optional[QueryFeatureMemo] = None,  # Memo of query features shared by query properties, see `QueryFeatureMemo`.
+) -> List[Dict[str, str]]:  # Relevant request properties of each query.
+    "Map the queries missing from `feature_memo` in chunks of `batch_size` and serialize the resulting tensors."
+
+    def compute(queries):
+        values = []
+        for i in range(0, len(queries), self.batch_size):
+            values.extend(_serialize_query_features(self.batch_mapping(queries[i : i + self.batch_size])))
+        return values
+
+    key = "ranking.features.query({})".format(self.name)
+    values = compute(queries) if feature_memo is None else feature_memo.map(self.batch_mapping, queries, compute)
+    return [{key: value} for value in values]
+
+@patch
+def get_query_properties(
+    self: BatchQueryRankingFeature, 
+    query: Optional[str] = None  # Query input.
+) -> Dict[str, str]:  # Contains the relevant request properties to be included in the query.
+    return self.get_batch_query_properties(queries=[query])[0]
+
+# %% ../003_module_query.ipynb 81
 class QueryModel(object):
     def __init__(
         self,
@@ -291,6 +513,7 @@ class QueryModel(object):
         match_phase: MatchFilter = AND(),  # Define the match criteria.
         ranking: Ranking = Ranking(),  # Define the rank criteria.
         body_function: Optional[Callable[[str], Dict]] = None,  # Function that take query as parameter and returns the body of a Vespa query.
+        body_batch_function: Optional[Callable[[List[str]], List[Dict]]] = None,  # Function that take a list of queries as parameter and returns their bodies. Used for batches of queries instead of `body_function`.
     ) -> None:
         """
         Define a query model.
@@ -303,60 +526,245 @@ class QueryModel(object):
         self.match_phase = match_phase
         self.ranking = ranking
         self.body_function = body_function
+        self.body_batch_function = body_batch_function
 
 
-# %% ../003_module_query.ipynb 71
+# %% ../003_module_query.ipynb 89
+@patch
+def _body_template(
+    self: QueryModel
+) -> Optional[Tuple[List[str], Dict]]:  # Parts of the YQL to be joined by the escaped query and match phase properties, or None.
+    "Compile the parts of the request body that do not depend on the query, once per match phase and ranking."
+    key = (self.match_phase, self.ranking.name, self.ranking.list_features)
+    if getattr(self, "_template_key", None) != key:
+        parts = self.match_phase.match_filter_template()
+        if parts is not None:
+            parts = list(parts)
+            parts[0] = "select * from sources * where " + parts[0]
+            parts[-1] = parts[-1] + ";"
+            self._template = (parts, self.match_phase.get_query_properties(query=None))
+        else:
+            self._template = None
+        self._template_key = key
+    return self._template
+
 @patch
 def create_body(
     self: QueryModel, 
-    query: str  # Query string.
+    query: str,  # Query string.
+    feature_memo: Optional[QueryFeatureMemo] = None,  # Memo of query features, see `QueryFeatureMemo`.
 ) -> Dict[str, str]:  # Request body
     "Create the appropriate request body to be sent to Vespa."
 
     if self.body_function:
         body = self.body_function(query)
         return body
+    return self.create_body_batch(queries=[query], feature_memo=feature_memo)[0]
 
-    query_properties = {}
-    for query_property in self.query_properties:
-        query_properties.update(query_property.get_query_properties(query=query))
-    query_properties.update(self.match_phase.get_query_properties(query=query))
-
-    match_filter = self.match_phase.create_match_filter(query=query)
-
-    body = {
-        "yql": "select * from sources * where {};".format(match_filter),
-        "ranking": {
-            "profile": self.ranking.name,
-            "listFeatures": self.ranking.list_features,
-        },
-    }
-    body.update(query_properties)
-    return body
+@patch
+def create_body_batch(
+    self: QueryModel, 
+    queries: List[str],  # Query strings.
+    feature_memo: Optional[QueryFeatureMemo] = None,  # Memo of query features, see `QueryFeatureMemo`.
+) -> List[Dict]:  # Request body of each query.
+    """
+    Create the request bodies of a batch of queries.
+
+    Query properties get the whole batch, see `BatchQueryRankingFeature`. Match phases providing 
+    a `match_filter_template` are compiled on first use, so that creating a body only escapes and 
+    substitutes the query. Other match phases create the YQL expression for every query.
+    """
+    if self.body_batch_function:
+        return self.body_batch_function(queries)
+    if self.body_function:
+        return [self.body_function(query) for query in queries]
+
+    property_batches = [
+        query_property.get_batch_query_properties(queries=queries, feature_memo=feature_memo) 
+        for query_property in self.query_properties
+    ]
+    template = self._body_template()
+    bodies = []
+    for idx, query in enumerate(queries):
+        if template is not None:
+            yql = _escape_query(query).join(template[0])
+            match_properties = template[1]
+        else:
+            yql = "select * from sources * where {};".format(
+                self.match_phase.create_match_filter(query=query)
+            )
+            match_properties = self.match_phase.get_query_properties(query=query)
+        body = {
+            "yql": yql,
+            "ranking": {
+                "profile": self.ranking.name,
+                "listFeatures": self.ranking.list_features,
+            },
+        }
+        for properties in property_batches:
+            body.update(properties[idx])
+        body.update(match_properties)
+        bodies.append(body)
+    return bodies
+
+# %% ../003_module_query.ipynb 98
+def _create_body_batch(
+    query_model: QueryModel,  # Query model creating the bodies.
+    queries: List[str],  # Query strings.
+    feature_memo: Optional[QueryFeatureMemo] = None,  # Memo of query features, see `QueryFeatureMemo`.
+) -> List[Dict]:  # Request body of each query.
+    "Create the request bodies of a batch of queries, calling `create_body` for each query when a subclass only overrides `create_body`."
+    model_class = type(query_model)
+    if model_class.create_body is not QueryModel.create_body and model_class.create_body_batch is QueryModel.create_body_batch:
+        return [query_model.create_body(query) for query in queries]
+    return query_model.create_body_batch(queries=queries, feature_memo=feature_memo)
+
+def _build_query_body_batch(
+    queries: List[str],
+    query_model: QueryModel,
+    recall_batch: Optional[List[Tuple]] = None,
+    feature_memo: Optional[QueryFeatureMemo] = None,
+    **kwargs,
+) -> List[Dict]:
+    assert query_model is not None, "No 'query_model' specified."
+    bodies = _create_body_batch(query_model, queries, feature_memo)
+    for idx, body in enumerate(bodies):
+        if recall_batch is not None and recall_batch[idx] is not None:
+            recall = recall_batch[idx]
+            body.update(
+                {
+                    "recall": "+("
+                    + " ".join(
+                        ["{}:{}".format(recall[0], str(doc)) for doc in recall[1]]
+                    )
+                    + ")"
+                }
+            )
+        body.update(kwargs)
+    return bodies
 
-# %% ../003_module_query.ipynb 78
 def _build_query_body(
     query: str,
     query_model: QueryModel,
     recall: Optional[Tuple] = None,
+    feature_memo: Optional[QueryFeatureMemo] = None,
     **kwargs,
 ) -> Dict:
-    assert query_model is not None, "No 'query_model' specified."
-    body = query_model.create_body(query=query)
-    if recall is not None:
-        body.update(
-            {
-                "recall": "+("
-                + " ".join(
-                    ["{}:{}".format(recall[0], str(doc)) for doc in recall[1]]
-                )
-                + ")"
-            }
-        )
-    body.update(kwargs)
-    return body
+    return _build_query_body_batch(
+        [query], query_model, None if recall is None else [recall], feature_memo, **kwargs
+    )[0]
+
+# %% ../003_module_query.ipynb 101
+async def _query_once(
+    async_app: VespaAsync,  # Open asynchronous connection layer of a Vespa application, see `Vespa.asyncio`.
+    body: Dict,  # Request body.
+) -> VespaQueryResponse:
+    "Send a query a single time, without the retries of `VespaAsync.query`, so that retries are left to the caller."
+    return await VespaAsync.query.retry_with(stop=stop_after_attempt(1), reraise=True)(async_app, body=body)
+
+def _failed_response(
+    error: Exception,  # Error raised while sending the query.
+    body: Optional[Dict] = None,  # Request body.
+) -> VespaQueryResponse:  # Response without status code, holding the error under the "error" key of `json`.
+    "Represent a query that got no response from the application, so that it can be counted and retried as a failure."
+    return VespaQueryResponse(
+        json={"error": "{}: {}".format(type(error).__name__, error)}, status_code=None, url=None, request_body=body
+    )
+
+class QuerySession(object):
+    def __init__(
+        self,
+        app: Vespa,  # Connection to a Vespa application.
+        connections: int = 100,  # Maximum number of queries in flight.
+        timeout: float = 30,  # Client timeout in seconds of each query.
+    ) -> None:
+        """
+        Persistent pool of connections to a Vespa application, shared by every query sent through it.
+
+        The async client of `Vespa.asyncio` is opened once in a background event loop and kept alive 
+        until `close`, so that consecutive batches reuse the same connections instead of setting up new ones. 
+        Queries are sent once, failed requests are left to the caller, e.g. the `RetryPolicy` of `evaluate`. 
+        Use it as a context manager or call `close` when done.
+        """
+        assert connections > 0, "connections must be a positive integer."
+        self.app = app
+        self.end_point = getattr(app, "end_point", None)
+        self.connections = connections
+        self.timeout = timeout
+        self._loop = None
+        self._thread = None
+        self._async_app = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+# %% ../003_module_query.ipynb 102
+@patch
+def open(self: QuerySession) -> QuerySession:
+    "Start the background event loop and open the connections. Called on first use."
+    if self._loop is None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        async_app = self.app.asyncio(connections=self.connections, total_timeout=self.timeout)
+        asyncio.run_coroutine_threadsafe(async_app.__aenter__(), self._loop).result()
+        self._async_app = async_app
+    return self
+
+@patch
+def close(self: QuerySession) -> None:
+    "Close the connections and stop the background event loop."
+    if self._loop is None:
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(self._async_app.__aexit__(None, None, None), self._loop).result()
+    finally:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop, self._thread, self._async_app = None, None, None
+
+@patch
+def query_batch(
+    self: QuerySession,
+    body_batch: List[Dict],  # Request bodies.
+    connections: Optional[int] = None,  # Maximum number of queries of the batch in flight. Default to the `connections` of the session.
+) -> List[VespaQueryResponse]:  # Responses in the order of `body_batch`.
+    "Send a batch of request bodies through the pooled connections, timing each request. Requests that raise get a response without status code, see `_failed_response`."
+    self.open()
+    limit = asyncio.Semaphore(connections if connections is not None else self.connections)
+
+    async def send_one(body):
+        async with limit:
+            start = time.perf_counter()
+            try:
+                response = await _query_once(self._async_app, body)
+            except Exception as e:
+                # a failed request must not cancel the other requests of the batch
+                response = _failed_response(e, body)
+                response.client_time = np.nan
+            else:
+                # round-trip time observed by the client, read by the `Latency` metric
+                response.client_time = time.perf_counter() - start
+            return response
+
+    async def send_all():
+        return await asyncio.gather(*[send_one(body) for body in body_batch])
 
-# %% ../003_module_query.ipynb 79
+    return asyncio.run_coroutine_threadsafe(send_all(), self._loop).result()
+
+@patch
+def query(
+    self: QuerySession,
+    body: Dict,  # Request body.
+) -> VespaQueryResponse:  # Response of the application.
+    "Send a single request body through the pooled connections."
+    return self.query_batch([body])[0]
+
+# %% ../003_module_query.ipynb 107
 def send_query(
     app: Vespa,  # Connection to a Vespa application
     body: Optional[Dict] = None,  # Contains all the request parameters. None when using `query_model`.
@@ -364,6 +772,7 @@ def send_query(
     query_model: Optional[QueryModel] = None,  # Query model. None when using `body`.
     debug_request: bool = False,  # Return request body for debugging instead of sending the request.
     recall: Optional[Tuple] = None,  # Tuple of size 2 where the first element is the name of the field to use to recall and the second element is a list of the values to be recalled.
+    session: Optional[QuerySession] = None,  # Persistent connections used instead of `app`, see `QuerySession`.
     **kwargs,  # Additional parameters to be sent along the request.
 ) -> VespaQueryResponse:  # Either the request body if debug_request is True or the result from the Vespa application.
     """
@@ -380,10 +789,143 @@ def send_query(
         return VespaQueryResponse(
             json={}, status_code=None, url=None, request_body=body
         )
+    elif session is not None:
+        return session.query(body=body)
     else:
         return app.query(body=body)
 
-# %% ../003_module_query.ipynb 98
+# %% ../003_module_query.ipynb 127
+class QueryCache(object):
+    def __init__(
+        self,
+        path: Optional[str] = None,  # Directory of the on-disk tier. Only the memory tier is used when None.
+        tag: str = "",  # Application or version tag included in every key.
+        max_memory_items: int = 1000,  # Maximum number of responses kept in memory.
+        max_disk_bytes: int = 2**30,  # Maximum size in bytes of the on-disk tier.
+    ) -> None:
+        """
+        Two-tier least recently used cache of successful query responses.
+
+        Recently used responses are kept in memory and every response is also written to a json file in `path`. 
+        The least recently used entries are evicted when a tier exceeds its size. Files found in `path` are reused, 
+        so the cache persists across sessions.
+        """
+        self.path = path
+        self.tag = tag
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()  # key -> response, least recently used first
+        self._disk = OrderedDict()  # key -> file size in bytes, least recently used first
+        self._disk_bytes = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            entries = [entry for entry in os.scandir(path) if entry.name.endswith(".json")]
+            for entry in sorted(entries, key=lambda x: x.stat().st_mtime):
+                self._disk[entry.name[: -len(".json")]] = entry.stat().st_size
+                self._disk_bytes += entry.stat().st_size
+
+# %% ../003_module_query.ipynb 128
+@patch
+def key(
+    self: QueryCache,
+    app: Vespa,  # Connection to a Vespa application.
+    body: Dict,  # Request body.
+) -> str:  # Hexadecimal digest identifying the response.
+    "Stable hash of the request body, the application end point and the cache tag."
+    content = json.dumps(
+        {"end_point": getattr(app, "end_point", None), "tag": self.tag, "body": body},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+# %% ../003_module_query.ipynb 129
+@patch
+def _remember(self: QueryCache, key: str, response: VespaQueryResponse) -> None:
+    self._memory[key] = response
+    self._memory.move_to_end(key)
+    while len(self._memory) > self.max_memory_items:
+        self._memory.popitem(last=False)
+
+@patch
+def get(
+    self: QueryCache,
+    app: Vespa,  # Connection to a Vespa application.
+    body: Dict,  # Request body.
+) -> Optional[VespaQueryResponse]:  # Cached response or None if the body is not in the cache.
+    "Retrieve the response of a request body, looking at the memory tier first."
+    key = self.key(app, body)
+    if key in self._memory:
+        self._memory.move_to_end(key)
+        self.hits += 1
+        return self._memory[key]
+    if key in self._disk:
+        file_path = os.path.join(self.path, key + ".json")
+        try:
+            with open(file_path, "r") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            self._disk_bytes -= self._disk.pop(key)
+        else:
+            os.utime(file_path)
+            self._disk.move_to_end(key)
+            response = VespaQueryResponse(
+                json=stored["json"], status_code=stored["status_code"], url=stored["url"]
+            )
+            self._remember(key, response)
+            self.hits += 1
+            return response
+    self.misses += 1
+    return None
+
+# %% ../003_module_query.ipynb 130
+@patch
+def put(
+    self: QueryCache,
+    app: Vespa,  # Connection to a Vespa application.
+    body: Dict,  # Request body.
+    response: VespaQueryResponse,  # Response to the request body. Only successful responses without errors are stored.
+) -> None:
+    "Store the response of a request body in both tiers, evicting the least recently used entries."
+    if response.status_code != 200 or response.json.get("root", {}).get("errors", None) is not None:
+        return
+    key = self.key(app, body)
+    self._remember(key, response)
+    if self.path is None:
+        return
+    content = json.dumps(
+        {"json": response.json, "status_code": response.status_code, "url": response.url}
+    ).encode("utf-8")
+    file_path = os.path.join(self.path, key + ".json")
+    with open(file_path + ".tmp", "wb") as f:
+        f.write(content)
+    os.replace(file_path + ".tmp", file_path)
+    self._disk_bytes += len(content) - self._disk.get(key, 0)
+    self._disk[key] = len(content)
+    self._disk.move_to_end(key)
+    while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 0:
+        evicted_key, size = self._disk.popitem(last=False)
+        self._disk_bytes -= size
+        try:
+            os.remove(os.path.join(self.path, evicted_key + ".json"))
+        except FileNotFoundError:
+            pass
+
+@patch
+def clear(self: QueryCache) -> None:
+    "Remove every entry of both tiers."
+    self._memory.clear()
+    for key in self._disk:
+        try:
+            os.remove(os.path.join(self.path, key + ".json"))
+        except FileNotFoundError:
+            pass
+    self._disk.clear()
+    self._disk_bytes = 0
+
+# %% ../003_module_query.ipynb 133
 def send_query_batch(
     app,  # Connection to a Vespa application
     body_batch: Optional[List[Dict]] = None,  # Contains all the request parameters. Set to None if using 'query_batch'.
@@ -393,6 +935,9 @@ def send_query_batch(
     asynchronous=True,  # Set True to send data in async mode. Default to True.
     connections: Optional[int] = 100,  # Number of allowed concurrent connections, valid only if `asynchronous=True`.
     total_timeout: int = 100,  # Total timeout in secs for each of the concurrent requests when using `asynchronous=True`.
+    cache: Optional[QueryCache] = None,  # Cache of query responses. Only bodies missing from the cache are sent to the app.
+    feature_memo: Optional[QueryFeatureMemo] = None,  # Memo of query features used when creating bodies from `query_batch`, see `QueryFeatureMemo`.
+    session: Optional[QuerySession] = None,  # Persistent connections used instead of `app.query_batch`, see `QuerySession`. `asynchronous` and `total_timeout` are ignored.
     **kwargs,  # Additional parameters to be sent along the request.
 ) -> List[VespaQueryResponse]:  # HTTP POST responses.
     "Send queries in batch to a Vespa app."
@@ -414,139 +959,394 @@ def send_query_batch(
             assert (
                 len(recall_batch) == number_of_queries
             ), "Specify one recall tuple for each query in the batch."
-            body_batch = [
-                _build_query_body(
-                    query=query, 
-                    query_model=query_model, 
-                    recall=recall,
-                    **kwargs
-                ) for query, recall in zip(query_batch, recall_batch)
-            ]
-        else:
-            body_batch = [
-                _build_query_body(
-                    query=query, 
-                    query_model=query_model, 
-                    **kwargs
-                ) for query in query_batch
-            ]
+        body_batch = _build_query_body_batch(
+            queries=query_batch, 
+            query_model=query_model, 
+            recall_batch=recall_batch, 
+            feature_memo=feature_memo,
+            **kwargs
+        )
     else:
         ValueError("Specify either 'query_batch' or 'body_batch'.")
 
-    return app.query_batch(
-        body_batch=body_batch,
-        asynchronous=asynchronous,
-        connections=connections,
-        total_timeout=total_timeout,
-    )
-
-# %% ../003_module_query.ipynb 109
-def _annotate_data(
-    hits, query_id, id_field, relevant_id, fields, relevant_score, default_score
-):
-    data = []
-    for h in hits:
-        record = {}
-        record.update({"document_id": h["fields"][id_field]})
-        record.update({"query_id": query_id})
-        record.update(
-            {
-                "label": relevant_score
-                if h["fields"][id_field] == relevant_id
-                else default_score
-            }
+    def send(body_batch):
+        if session is not None:
+            return session.query_batch(body_batch=body_batch, connections=connections)
+        return app.query_batch(
+            body_batch=body_batch,
+            asynchronous=asynchronous,
+            connections=connections,
+            total_timeout=total_timeout,
         )
-        for field in fields:
-            field_value = h["fields"].get(field, None)
-            if field_value:
-                if isinstance(field_value, dict):
-                    record.update(field_value)
-                else:
-                    record.update({field: field_value})
-        data.append(record)
-    return data
-
-
-# %% ../003_module_query.ipynb 110
+
+    if cache is None:
+        return send(body_batch)
+    responses = [cache.get(app, body) for body in body_batch]
+    for response in responses:
+        if response is not None:
+            # cached responses were not timed by this call
+            response.client_time = np.nan
+    missing = [idx for idx, response in enumerate(responses) if response is None]
+    if len(missing) > 0:
+        missing_responses = send([body_batch[idx] for idx in missing])
+        for idx, response in zip(missing, missing_responses):
+            cache.put(app, body_batch[idx], response)
+            responses[idx] = response
+    return responses
+
+# %% ../003_module_query.ipynb 146
+class _FeatureColumns(object):
+    "Preallocated float32 columns holding the Vespa features of up to `size` hits."
+
+    def __init__(
+        self,
+        size: int,  # Maximum number of hits.
+        fields: List[str],  # Vespa fields to collect, e.g. ["rankfeatures", "summaryfeatures"].
+        keep_features: Optional[List[str]] = None,  # Features to collect. All the features of `fields` when None.
+    ) -> None:
+        self.size = size
+        self.fields = fields
+        self.keep_features = None if keep_features is None else set(keep_features)
+        self.names = []
+        self.positions = {}
+        self.values = np.full((size, 0), np.nan, dtype=np.float32)
+        self.objects = {}  # Non-numeric values by feature and row.
+        self.layouts = {}  # Feature names of the first value of each field, with the columns they are stored in.
+        for name in keep_features or []:
+            self._position(name)
+
+    def _position(self, name: str) -> int:
+        if name not in self.positions:
+            if len(self.names) == self.values.shape[1]:
+                values = np.full(
+                    (self.size, max(2 * len(self.names), 16)), np.nan, dtype=np.float32
+                )
+                values[:, : len(self.names)] = self.values
+                self.values = values
+            self.positions[name] = len(self.names)
+            self.names.append(name)
+        return self.positions[name]
+
+    def _set(self, row: int, name: str, value) -> None:
+        if self.keep_features is not None and name not in self.keep_features:
+            return
+        if isinstance(value, (int, float)):
+            self.values[row, self._position(name)] = value
+        else:
+            self.objects.setdefault(self._position(name), {})[row] = value
+
+    def _layout(self, field_value: Dict) -> Tuple:
+        names = [
+            name for name in field_value
+            if self.keep_features is None or name in self.keep_features
+        ]
+        if not all([isinstance(field_value[name], (int, float)) for name in names]):
+            return tuple(field_value), None, None
+        positions = [self._position(name) for name in names]
+        columns = positions
+        if len(positions) > 0 and positions == list(range(positions[0], positions[0] + len(positions))):
+            columns = slice(positions[0], positions[0] + len(positions))
+        if len(names) == len(field_value):
+            return tuple(field_value), columns, lambda x: list(x.values())
+        return tuple(field_value), columns, lambda x: [x[name] for name in names]
+
+    def add(
+        self,
+        row: int,  # Row of the hit.
+        hit_fields: Dict,  # Fields of the hit.
+    ) -> None:
+        "Store the features contained in the `fields` of a hit."
+        for field in self.fields:
+            field_value = hit_fields.get(field, None)
+            if not field_value:
+                continue
+            if not isinstance(field_value, dict):
+                self._set(row, field, field_value)
+                continue
+            layout = self.layouts.get(field, None)
+            if layout is None:
+                layout = self.layouts[field] = self._layout(field_value)
+            if layout[2] is not None and tuple(field_value) == layout[0]:
+                try:
+                    self.values[row, layout[1]] = layout[2](field_value)
+                    continue
+                except (TypeError, ValueError):
+                    pass
+            for name, value in field_value.items():
+                self._set(row, name, value)
+
+    def to_df(
+        self, 
+        rows: int  # Number of hits stored.
+    ) -> DataFrame:
+        "DataFrame with one column per feature, in the order they were discovered."
+        df = DataFrame(self.values[:rows, : len(self.names)], columns=self.names)
+        for position, values in self.objects.items():
+            column = self.values[:rows, position].astype(object)
+            for row, value in values.items():
+                column[row] = value
+            df[self.names[position]] = column
+        return df
+
+def _extract_features(
+    query_data: List[Tuple],  # Query id, query and scores of the relevant documents of each query.
+    hits: List[List[Dict]],  # Hits returned for each query.
+    id_field: str,  # The Vespa field representing the document id.
+    fields: List[str],  # Vespa fields to collect, e.g. ["rankfeatures", "summaryfeatures"].
+    keep_features: Optional[List[str]] = None,  # Features to collect. All the features of `fields` when None.
+    default_score: int = 0,  # Score to assign to the documents that are not relevant.
+) -> DataFrame:  # DataFrame with document_id, query_id, label and one float32 column per feature.
+    "Label the hits of each query and extract their features, skipping repeated documents."
+    columns = _FeatureColumns(sum([len(x) for x in hits]), fields, keep_features)
+    document_ids, query_ids, labels, seen = [], [], [], set()
+    for ((query_id, query, relevant_docs), query_hits) in zip(query_data, hits):
+        for hit in query_hits:
+            document_id = hit["fields"][id_field]
+            label = relevant_docs.get(document_id, default_score)
+            if (document_id, query_id, label) in seen:
+                continue
+            seen.add((document_id, query_id, label))
+            columns.add(len(labels), hit["fields"])
+            document_ids.append(document_id)
+            query_ids.append(query_id)
+            labels.append(label)
+    df = columns.to_df(len(labels))
+    df.insert(0, "label", labels)
+    df.insert(0, "query_id", query_ids)
+    df.insert(0, "document_id", document_ids)
+    if not df["query_id"].is_monotonic_increasing:
+        df = df.sort_values("query_id", kind="stable", ignore_index=True)
+    return df
+
+# %% ../003_module_query.ipynb 148
 def _parse_labeled_data(
-    df: DataFrame  # DataFrame with the following required columns ["qid", "query", "doc_id", "relevance"].
-) -> List[Dict]:  # Concise representation of the labeled data, grouped by query_id and query.
-    "Convert a DataFrame with labeled data to format used internally"
+    df: DataFrame,  # DataFrame with the following required columns ["qid", "query", "doc_id", "relevance"].
+    columnar: bool = False,  # Return flat columns with per-query offsets instead of a list of dict.
+) -> List[Dict]:  # Concise representation of the labeled data, grouped by query_id and query. A dict of columns when `columnar=True`.
+    """
+    Convert a DataFrame with labeled data to format used internally
+
+    Rows are grouped by (qid, query) with a single stable sort, keeping the order in which queries first appear 
+    and the order of the rows within each query. With `columnar=True`, the result holds the lists `query_id` and 
+    `query`, one entry per query, the arrays `doc_id` and `relevance`, one entry per row sorted by query, and 
+    `offsets`, such that the rows of query `i` are `offsets[i]` to `offsets[i + 1]`.
+    """
     required_columns = ["qid", "query", "doc_id", "relevance"]
     assert all(
         [x in list(df.columns) for x in required_columns]
     ), "DataFrame needs at least the following columns: {}".format(required_columns)
-    qid_query = (
-        df[["qid", "query"]].drop_duplicates(["qid", "query"]).to_dict(orient="records")
-    )
-    labeled_data = []
-    for q in qid_query:
-        docid_relevance = df[(df["qid"] == q["qid"]) & (df["query"] == q["query"])][
-            ["doc_id", "relevance"]
-        ]
-        relevant_docs = []
-        for idx, row in docid_relevance.iterrows():
-            relevant_docs.append({"id": row["doc_id"], "score": row["relevance"]})
-        data_point = {
-            "query_id": q["qid"],
-            "query": q["query"],
-            "relevant_docs": relevant_docs,
+    codes = df.groupby(["qid", "query"], sort=False, dropna=False).ngroup().to_numpy()
+    order = np.argsort(codes, kind="stable")
+    offsets = np.searchsorted(codes[order], np.arange(codes.max() + 2 if len(codes) > 0 else 1))
+    first_rows = order[offsets[:-1]]
+    query_ids = df["qid"].iloc[first_rows].tolist()
+    queries = df["query"].iloc[first_rows].tolist()
+    doc_ids = df["doc_id"].to_numpy()[order]
+    relevances = df["relevance"].to_numpy()[order]
+    if columnar:
+        return {
+            "query_id": query_ids,
+            "query": queries,
+            "doc_id": doc_ids,
+            "relevance": relevances,
+            "offsets": offsets,
+        }
+    doc_ids, relevances, bounds = doc_ids.tolist(), relevances.tolist(), offsets.tolist()
+    return [
+        {
+            "query_id": query_id,
+            "query": query,
+            "relevant_docs": [
+                {"id": doc_id, "score": score} 
+                for doc_id, score in zip(doc_ids[start:end], relevances[start:end])
+            ],
+        }
+        for query_id, query, start, end in zip(query_ids, queries, bounds[:-1], bounds[1:])
+    ]
+
+# %% ../003_module_query.ipynb 153
+def _flat_array(
+    values,  # Values of a column of labeled data.
+) -> np.ndarray:
+    "Array of `values`, of object dtype when they mix types that numpy would convert, e.g. int and str document ids."
+    if not isinstance(values, np.ndarray) and len(set(type(x) for x in values)) > 1:
+        return np.asarray(values, dtype=object)
+    return np.asarray(values)
+
+class LabeledData(object):
+    def __init__(
+        self,
+        query_id,  # Query id of each query.
+        query,  # Query string of each query.
+        doc_id,  # Relevant document ids of all the queries, grouped by query.
+        relevance,  # Relevance grade of each document in `doc_id`.
+        offsets,  # Position in `doc_id` of the first document of each query, followed by the end of the last query.
+    ) -> None:
+        """
+        Labeled data stored as flat arrays with per-query offsets.
+
+        The relevant documents of query `i` are `doc_id[offsets[i]:offsets[i + 1]]` with grades 
+        `relevance[offsets[i]:offsets[i + 1]]`. Slicing returns a `LabeledData` sharing the arrays of the original, 
+        while indexing and iteration give the dict format accepted wherever labeled data is expected, see `from_records`. 
+        Missing grades are stored as NaN and left out of the dict format, so that consumers apply their own default.
+        """
+        self.query_id = np.asarray(query_id, dtype=object)
+        self.query = np.asarray(query, dtype=object)
+        self.doc_id = _flat_array(doc_id)
+        self.relevance = np.asarray(relevance)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        assert (
+            len(self.query) == len(self.query_id) and len(self.offsets) == len(self.query_id) + 1
+        ), "'query' needs one entry per query and 'offsets' one more."
+        assert len(self.relevance) == len(self.doc_id), "'doc_id' and 'relevance' need the same size."
+        assert (
+            np.all(np.diff(self.offsets) >= 0) and self.offsets[-1] <= len(self.doc_id)
+        ), "'offsets' must be non-decreasing positions in 'doc_id'."
+
+    @staticmethod
+    def from_records(
+        labeled_data: Iterable[Dict],  # Labeled data in dict format, e.g. [{"query_id": "0", "query": "...", "relevant_docs": [{"id": "d1", "score": 1}]}].
+    ) -> "LabeledData":
+        "Create labeled data from records in dict format."
+        query_ids, queries, doc_ids, relevances, offsets = [], [], [], [], [0]
+        for data in labeled_data:
+            query_ids.append(data["query_id"])
+            queries.append(data["query"])
+            for doc in data["relevant_docs"]:
+                doc_ids.append(doc["id"])
+                relevances.append(doc.get("score", np.nan))
+            offsets.append(len(doc_ids))
+        return LabeledData(query_ids, queries, doc_ids, relevances, offsets)
+
+    @staticmethod
+    def from_df(
+        df: DataFrame,  # DataFrame with the following required columns ["qid", "query", "doc_id", "relevance"].
+    ) -> "LabeledData":
+        "Create labeled data from a DataFrame with one row per judged document."
+        return LabeledData(**_parse_labeled_data(df=df, columnar=True))
+
+    @staticmethod
+    def from_arrow(
+        table,  # Arrow table with the following required columns ["qid", "query", "doc_id", "relevance"].
+    ) -> "LabeledData":
+        "Create labeled data from an Arrow table with one row per judged document."
+        return LabeledData.from_df(table.select(["qid", "query", "doc_id", "relevance"]).to_pandas())
+
+    def __len__(self) -> int:
+        return len(self.query_id)
+
+    def _record(self, idx: int, start: int, end: int) -> Dict:
+        return {
+            "query_id": self.query_id[idx],
+            "query": self.query[idx],
+            "relevant_docs": [
+                {"id": doc_id, "score": score} if score == score else {"id": doc_id}  # NaN marks a missing score
+                for doc_id, score in zip(self.doc_id[start:end].tolist(), self.relevance[start:end].tolist())
+            ],
         }
-        labeled_data.append(data_point)
-    return labeled_data
 
-# %% ../003_module_query.ipynb 114
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            positions = range(len(self))[key]
+            if positions.step != 1:
+                return LabeledData.from_records(self[idx] for idx in positions)
+            stop = max(positions.start, positions.stop)
+            return LabeledData(
+                self.query_id[positions.start : stop],
+                self.query[positions.start : stop],
+                self.doc_id,
+                self.relevance,
+                self.offsets[positions.start : stop + 1],
+            )
+        idx = range(len(self))[key]
+        return self._record(idx, self.offsets[idx], self.offsets[idx + 1])
+
+    def __iter__(self) -> Iterator[Dict]:
+        bounds = self.offsets.tolist()
+        for idx in range(len(self)):
+            yield self._record(idx, bounds[idx], bounds[idx + 1])
+
+    def __repr__(self) -> str:
+        return "LabeledData(queries={}, documents={})".format(
+            len(self), int(self.offsets[-1] - self.offsets[0])
+        )
+
+    def to_records(self) -> List[Dict]:
+        "Labeled data in dict format."
+        return list(self)
+
+    def to_df(self) -> DataFrame:
+        "DataFrame with one row per judged document and the columns ['qid', 'query', 'doc_id', 'relevance']."
+        start, end = self.offsets[0], self.offsets[-1]
+        counts = np.diff(self.offsets)
+        return DataFrame(
+            data={
+                "qid": np.repeat(self.query_id, counts),
+                "query": np.repeat(self.query, counts),
+                "doc_id": self.doc_id[start:end],
+                "relevance": self.relevance[start:end],
+            }
+        )
+
+# %% ../003_module_query.ipynb 163
 def collect_vespa_features(
     app: Vespa,  # Connection to a Vespa application.
-    labeled_data,  # Labelled data containing query, query_id and relevant ids. See examples about data format.
+    labeled_data,  # Labelled data containing query, query_id and relevant ids, as a list of dict, a DataFrame or `LabeledData`. See examples about data format.
     id_field: str,  # The Vespa field representing the document id.
     query_model: QueryModel,  # Query model.
-    number_additional_docs: int,  # Number of additional documents to retrieve for each relevant document. Duplicate documents will be dropped.
+    number_additional_docs: int,  # Number of additional documents to retrieve for each query. Duplicate documents will be dropped.
     fields: List[str],  # Vespa fields to collect, e.g. ["rankfeatures", "summaryfeatures"]
     keep_features: Optional[List[str]] = None,  # List containing the names of the features that should be returned. Default to None, which return all the features contained in the 'fields' argument.
     relevant_score: int = 1,  # Score to assign to relevant documents. Default to 1.
     default_score: int = 0,  # Score to assign to the additional documents that are not relevant. Default to 0.
+    cache: Optional[QueryCache] = None,  # Cache of query responses, see `QueryCache`.
+    session: Optional[QuerySession] = None,  # Persistent connections shared by every request, see `QuerySession`.
     **kwargs,  # Extra keyword arguments to be included in the Vespa Query.
 ) -> DataFrame:  # DataFrame containing document id (document_id), query id (query_id), scores (relevant) and vespa rank features returned by the Query model RankProfile used.
     """
     Collect Vespa features based on a set of labelled data.
+
+    Each query is sent once with a `recall` matching all of its relevant documents, and once more for the 
+    `number_additional_docs` top documents when positive. Relevant documents are labeled with their score and 
+    every other document with `default_score`. Features are stored as float32 columns, and only the ones in 
+    `keep_features` are extracted when specified.
     """
 
     if isinstance(labeled_data, DataFrame):
-        labeled_data = _parse_labeled_data(df=labeled_data)
+        labeled_data = LabeledData.from_df(labeled_data)
 
-    flat_data = [
+    query_data = [
         (
             data["query_id"],
             data["query"],
-            relevant_doc["id"],
-            relevant_doc.get("score", relevant_score),
+            {
+                relevant_doc["id"]: relevant_doc.get("score", relevant_score)
+                for relevant_doc in data["relevant_docs"]
+            },
         )
         for data in labeled_data
-        for relevant_doc in data["relevant_docs"]
+        if len(data["relevant_docs"]) > 0
     ]
 
-    queries = [x[1] for x in flat_data]
+    queries = [x[1] for x in query_data]
     relevant_search = send_query_batch(
         app=app,
         query_batch=queries,
         query_model=query_model,
-        recall_batch=[(id_field, [x[2]]) for x in flat_data],
-        **kwargs,
+        recall_batch=[(id_field, list(x[2])) for x in query_data],
+        cache=cache,
+        session=session,
+        **{**kwargs, "hits": max([len(x[2]) for x in query_data], default=1)},
     )
-    result = []
-    for ((query_id, query, relevant_id, relevant_score), query_result) in zip(
-        flat_data, relevant_search
+    hits = []
+    for ((query_id, query, relevant_docs), query_result) in zip(
+        query_data, relevant_search
     ):
-        result.extend(
-            _annotate_data(
-                hits=query_result.hits,
-                query_id=query_id,
-                id_field=id_field,
-                relevant_id=relevant_id,
-                fields=fields,
-                relevant_score=relevant_score,
-                default_score=default_score,
+        position = {doc_id: idx for idx, doc_id in enumerate(relevant_docs)}
+        hits.append(
+            sorted(
+                query_result.hits,
+                key=lambda h: position.get(h["fields"][id_field], len(position)),
             )
         )
     if number_additional_docs > 0:
@@ -555,48 +1355,139 @@ def collect_vespa_features(
             query_batch=queries,
             query_model=query_model,
             hits=number_additional_docs,
+            cache=cache,
+            session=session,
             **kwargs,
         )
-        for ((query_id, query, relevant_id, relevant_score), query_result) in zip(
-            flat_data, additional_hits_result
-        ):
-            result.extend(
-                _annotate_data(
-                    hits=query_result.hits,
-                    query_id=query_id,
-                    id_field=id_field,
-                    relevant_id=relevant_id,
-                    fields=fields,
-                    relevant_score=relevant_score,
-                    default_score=default_score,
-                )
-            )
-    df = DataFrame.from_records(result)
-    df = df.drop_duplicates(["document_id", "query_id", "label"])
-    df = df.sort_values("query_id")
-    if keep_features:
-        df = df[["document_id", "query_id", "label"] + keep_features]
-    return df
+        for query_hits, query_result in zip(hits, additional_hits_result):
+            query_hits.extend(query_result.hits)
+    return _extract_features(
+        query_data=query_data,
+        hits=hits,
+        id_field=id_field,
+        fields=fields,
+        keep_features=keep_features if keep_features else None,
+        default_score=default_score,
+    )
 
-# %% ../003_module_query.ipynb 129
+# %% ../003_module_query.ipynb 180
+_FEATURE_SHARD_FORMATS = ["parquet", "arrow", "npz"]
+_FEATURE_SCHEMA_FILE = "schema.json"
+
+def _feature_shard_schema(
+    output_dir: str,  # Directory holding the shards.
+) -> Optional[Dict]:  # Format and columns of the shards, None if no shard was written.
+    schema_file = os.path.join(output_dir, _FEATURE_SCHEMA_FILE)
+    if not os.path.isfile(schema_file):
+        return None
+    with open(schema_file, "r") as f:
+        return json.load(f)
+
+def _feature_shard_paths(
+    output_dir: str,  # Directory holding the shards.
+    output_format: str,  # Either "parquet", "arrow" or "npz".
+) -> List[str]:  # Paths of the shards, in the order they were written.
+    return [
+        os.path.join(output_dir, file_name)
+        for file_name in sorted(os.listdir(output_dir))
+        if file_name.startswith("part-") and file_name.endswith("." + output_format)
+    ]
+
+def _apply_feature_schema(
+    df: DataFrame,  # Vespa features returned by `collect_vespa_features`.
+    columns: List[str],  # Columns of the schema.
+) -> DataFrame:  # Vespa features with the columns of the schema, and float32 labels and features.
+    df = df.reindex(columns=columns)
+    features = [name for name in columns if name not in ["document_id", "query_id"]]
+    non_numeric = [name for name in features if not is_numeric_dtype(df[name])]
+    if len(non_numeric) > 0:
+        raise ValueError(
+            "Features {} have non-numeric values and cannot be stored as float32. ".format(non_numeric)
+            + "Leave them out of 'keep_features' or use output_format='csv'."
+        )
+    return df.astype({name: np.float32 for name in features})
+
+def _write_feature_shard(
+    df: DataFrame,  # Vespa features with the columns of the schema.
+    output_dir: str,  # Directory holding the shards.
+    output_format: str,  # Either "parquet", "arrow" or "npz".
+) -> str:  # Path of the shard.
+    file_path = os.path.join(
+        output_dir,
+        "part-{:05d}.{}".format(len(_feature_shard_paths(output_dir, output_format)), output_format),
+    )
+    if output_format == "parquet":
+        df.to_parquet(file_path, index=False)
+    elif output_format == "arrow":
+        df.reset_index(drop=True).to_feather(file_path)
+    else:
+        columns = {}
+        for name in df.columns:
+            values = df[name].to_numpy()
+            columns[name] = values.astype(str) if values.dtype == object else values
+        with open(file_path, "wb") as f:
+            np.savez(f, **columns)
+    return file_path
+
+def _read_feature_shard(
+    file_path: str,  # Path of the shard.
+    output_format: str,  # Either "parquet", "arrow" or "npz".
+    columns: Optional[List[str]] = None,  # Columns to read. All of them when None.
+) -> DataFrame:
+    if output_format == "parquet":
+        return read_parquet(file_path, columns=columns)
+    if output_format == "arrow":
+        return read_feather(file_path, columns=columns)
+    with np.load(file_path) as shard:
+        return DataFrame({name: shard[name] for name in (columns or shard.files)})
+
+def _iter_vespa_feature_shards(
+    output_dir: str,  # Directory written by `store_vespa_features`.
+    columns: Optional[List[str]] = None,  # Columns to read. All of them when None.
+) -> Iterator[DataFrame]:
+    "Read the shards written by `store_vespa_features` one at a time."
+    schema = _feature_shard_schema(output_dir)
+    assert schema is not None, "No Vespa features stored in {}.".format(output_dir)
+    for file_path in _feature_shard_paths(output_dir, schema["format"]):
+        yield _read_feature_shard(file_path, schema["format"], columns)
+
+# %% ../003_module_query.ipynb 181
 def store_vespa_features(
     app: Vespa,  # Connection to a Vespa application.
-    output_file_path: str,  # Path of the .csv output file. It will create the file of it does not exist and append the vespa features to an pre-existing file.
-    labeled_data,  # Labelled data containing query, query_id and relevant ids. See details about data format.
+    output_file_path: str,  # Path of the .csv output file, or of the shard directory when `output_format` is not 'csv'. It will create the file or directory if it does not exist and append the vespa features to pre-existing ones.
+    labeled_data,  # Labelled data containing query, query_id and relevant ids, as a list of dict, a DataFrame or `LabeledData`. See details about data format.
     id_field: str,  # The Vespa field representing the document id.
     query_model: QueryModel,  # Query model.
-    number_additional_docs: int,  # Number of additional documents to retrieve for each relevant document.
+    number_additional_docs: int,  # Number of additional documents to retrieve for each query.
     fields: List[str],  # List of Vespa fields to collect, e.g. ["rankfeatures", "summaryfeatures"]
     keep_features: Optional[List[str]] = None,  # List containing the names of the features that should be returned. Default to None, which return all the features contained in the 'fields' argument.
     relevant_score: int = 1,  # Score to assign to relevant documents.
     default_score: int = 0,  # Score to assign to the additional documents that are not relevant.
     batch_size=1000,  # The size of the batch of labeled data points to be processed.
+    cache: Optional[QueryCache] = None,  # Cache of query responses, see `QueryCache`.
+    session: Optional[QuerySession] = None,  # Persistent connections shared by every request, see `QuerySession`.
+    output_format: str = "csv",  # Either "csv", or "parquet", "arrow" (Arrow IPC) and "npz" (NumPy) for one shard per batch.
     **kwargs,  # Extra keyword arguments to be included in the Vespa Query.
 ) -> int:  # returns 0 upon success.
-    "Retrieve Vespa rank features and store them in a .csv file."
+    """
+    Retrieve Vespa rank features and store them in a .csv file or in binary shards.
 
+    Binary shards are written to the `output_file_path` directory, one per batch. Their schema is fixed by the first 
+    batch and kept when appending: later batches get the same columns, with missing features left empty and new 
+    ones dropped. Labels and features are stored as float32. Use `read_vespa_features` to read them back.
+    """
+
+    assert output_format == "csv" or output_format in _FEATURE_SHARD_FORMATS, "'output_format' should be one of {}.".format(
+        ["csv"] + _FEATURE_SHARD_FORMATS
+    )
+    schema = None
+    if output_format != "csv" and os.path.isdir(output_file_path):
+        schema = _feature_shard_schema(output_file_path)
+        assert (
+            schema is None or schema["format"] == output_format
+        ), "Vespa features in {} are stored as {}.".format(output_file_path, schema["format"])
     if isinstance(labeled_data, DataFrame):
-        labeled_data = _parse_labeled_data(df=labeled_data)
+        labeled_data = LabeledData.from_df(labeled_data)
 
     mini_batches = [
         labeled_data[i : i + batch_size]
@@ -613,9 +1504,22 @@ def store_vespa_features(
             keep_features=keep_features,
             relevant_score=relevant_score,
             default_score=default_score,
+            cache=cache,
+            session=session,
             **kwargs,
         )
-        if os.path.isfile(output_file_path):
+        if output_format != "csv":
+            if vespa_features.shape[0] > 0:
+                # non-numeric features are rejected before anything is written
+                columns = list(vespa_features.columns) if schema is None else schema["columns"]
+                shard = _apply_feature_schema(vespa_features, columns)
+                if schema is None:
+                    schema = {"format": output_format, "columns": columns}
+                    os.makedirs(output_file_path, exist_ok=True)
+                    with open(os.path.join(output_file_path, _FEATURE_SCHEMA_FILE), "w") as f:
+                        json.dump(schema, f)
+                _write_feature_shard(shard, output_file_path, output_format)
+        elif os.path.isfile(output_file_path):
             vespa_features.to_csv(
                 path_or_buf=output_file_path, header=False, index=False, mode="a"
             )
@@ -632,3 +1536,223 @@ def store_vespa_features(
         )
     return 0
 
+
+# %% ../003_module_query.ipynb 182
+def read_vespa_features(
+    output_dir: str,  # Directory where `store_vespa_features` wrote the shards.
+    columns: Optional[List[str]] = None,  # Columns to read, e.g. ["query_id", "label", "nativeRank(text)"]. All of them when None.
+) -> DataFrame:  # DataFrame with the Vespa features of all the shards.
+    "Read the Vespa features stored in Parquet, Arrow IPC or NumPy shards."
+    schema = _feature_shard_schema(output_dir)
+    assert schema is not None, "No Vespa features stored in {}.".format(output_dir)
+    shards = list(_iter_vespa_feature_shards(output_dir, columns))
+    if len(shards) == 0:
+        return DataFrame(columns=columns or schema["columns"])
+    return concat(shards, ignore_index=True)
+
+# %% ../003_module_query.ipynb 195
+class LoadSchedule(object):
+    def __init__(
+        self,
+        stages: List[Tuple],  # Consecutive stages, either (duration, qps) for a constant rate or (duration, start_qps, end_qps) for a linear ramp. Durations in seconds.
+        warmup: float = 0,  # Number of seconds at the start of the schedule whose queries are sent but not reported.
+        arrivals: str = "uniform",  # Either "uniform" for evenly spaced arrivals or "poisson" for exponential inter-arrival times.
+        seed: Optional[int] = None,  # Seed of the random generator used by "poisson" arrivals.
+    ) -> None:
+        """
+        Open-loop arrival schedule of a load test.
+
+        Query arrivals follow the target rate of each stage, independently of how fast the application answers. 
+        The arrival times are computed upfront, so that the same schedule always produces the same arrivals.
+        """
+        assert len(stages) > 0, "Specify at least one stage."
+        assert all(
+            [len(stage) in [2, 3] for stage in stages]
+        ), "Stages must be (duration, qps) or (duration, start_qps, end_qps) tuples."
+        self.stages = [
+            (float(stage[0]), float(stage[1]), float(stage[-1])) for stage in stages
+        ]
+        assert all(
+            [duration > 0 and min(start, end) >= 0 for duration, start, end in self.stages]
+        ), "Stage durations must be positive and rates non-negative."
+        assert arrivals in ["uniform", "poisson"], "arrivals must be 'uniform' or 'poisson'."
+        self.duration = sum([stage[0] for stage in self.stages])
+        assert 0 <= warmup < self.duration, "warmup must be shorter than the schedule."
+        self.warmup = warmup
+        self.arrivals = arrivals
+        self.seed = seed
+
+# %% ../003_module_query.ipynb 196
+@patch
+def arrival_times(
+    self: LoadSchedule
+) -> np.ndarray:  # Arrival time in seconds of every query since the start of the schedule.
+    "Invert the cumulative number of expected arrivals at the target count of each query."
+    durations, start_rates, end_rates = [np.array(x) for x in zip(*self.stages)]
+    stage_starts = np.concatenate([[0.0], np.cumsum(durations)[:-1]])
+    stage_counts = (start_rates + end_rates) / 2 * durations
+    count_ends = np.cumsum(stage_counts)
+    if self.arrivals == "uniform":
+        targets = np.arange(int(round(count_ends[-1]))) + 0.5
+    else:
+        rng = np.random.default_rng(self.seed)
+        targets = np.cumsum(rng.exponential(size=int(count_ends[-1] + 10 * np.sqrt(count_ends[-1]) + 10)))
+        while targets[-1] < count_ends[-1]:
+            targets = np.concatenate([targets, targets[-1] + np.cumsum(rng.exponential(size=len(targets)))])
+        targets = targets[targets < count_ends[-1]]
+    stage = np.minimum(np.searchsorted(count_ends, targets, side="left"), len(count_ends) - 1)
+    remaining = np.maximum(targets - (count_ends - stage_counts)[stage], 0)
+    # solve rate * s + slope / 2 * s ** 2 = remaining, in a form that is stable when the slope is zero
+    rate, slope = start_rates[stage], ((end_rates - start_rates) / durations)[stage]
+    offset = 2 * remaining / (rate + np.sqrt(rate ** 2 + 2 * slope * remaining))
+    return stage_starts[stage] + np.minimum(offset, durations[stage])
+
+# %% ../003_module_query.ipynb 200
+def _load_test_report(
+    requests: DataFrame,  # One row per query with the scheduled, sent and completed times and the outcome.
+    warmup: float,  # Seconds at the start of the schedule not included in the report.
+    percentiles: List[float],  # Latency percentiles to report, between 0 and 100.
+) -> DataFrame:
+    measured = requests[requests["scheduled"] >= warmup]
+    second = np.floor(measured["scheduled"] - warmup).astype(int)
+    completed_second = np.floor(measured["completed"] - warmup).astype(int)
+    grouped = measured.groupby(second)
+    report = DataFrame({"sent": grouped.size(), "errors": grouped["error"].sum()})
+    for percentile in percentiles:
+        report["latency_p{:g}".format(percentile)] = grouped["latency"].quantile(percentile / 100)
+    report["latency_max"] = grouped["latency"].max()
+    throughput = (~measured["error"]).groupby(completed_second).sum()
+    seconds = Index(
+        range(int(max(report.index.max(), throughput.index.max())) + 1), name="second"
+    ) if len(measured) > 0 else Index([], name="second", dtype=int)
+    report = report.reindex(seconds)
+    report[["sent", "errors"]] = report[["sent", "errors"]].fillna(0).astype(int)
+    report.insert(1, "throughput", throughput.reindex(seconds, fill_value=0).astype(int))
+    report.insert(3, "error_rate", report["errors"] / report["sent"].where(report["sent"] > 0))
+    return report
+
+# %% ../003_module_query.ipynb 201
+async def load_test_async(
+    app: Vespa,  # Connection to a Vespa application.
+    schedule: LoadSchedule,  # Arrival schedule of the queries.
+    body_batch: Optional[List[Dict]] = None,  # Request bodies to replay. Set to None if using 'labeled_data'.
+    labeled_data=None,  # Labelled data whose queries are replayed with `query_model`. Set to None if using 'body_batch'.
+    query_model: Optional[QueryModel] = None,  # Query model used to create the bodies of `labeled_data`.
+    connections: int = 100,  # Number of connections kept open to the application.
+    timeout: float = 30,  # Client timeout in seconds of each query.
+    percentiles: List[float] = [50, 90, 99],  # Latency percentiles reported per second, between 0 and 100.
+    **kwargs,  # Additional parameters to be sent along the request.
+) -> DataFrame:  # One row per second after the warm-up with sent, throughput, errors, error_rate and latency percentiles.
+    """
+    Replay queries at the rate given by `schedule` and report the load the application sustained every second.
+
+    Query bodies are replayed in order, cycling through them until the schedule ends. Queries are sent at their 
+    scheduled time whether or not previous queries were answered, and are not retried. The latency is measured 
+    from the scheduled time, so that delays of the client are not hidden. Errors are failed requests, non 200 
+    responses and responses with errors. Throughput counts the successful responses completed in each second. 
+    The DataFrame `attrs` hold the raw measurements under `requests` and totals of the measured period under `summary`.
+    """
+    if body_batch is None:
+        assert (
+            labeled_data is not None and query_model is not None
+        ), "Specify either 'body_batch' or 'labeled_data' and 'query_model'."
+        if isinstance(labeled_data, DataFrame):
+            labeled_data = LabeledData.from_df(labeled_data)
+        body_batch = _build_query_body_batch(
+            [data["query"] for data in labeled_data], query_model, **kwargs
+        )
+    else:
+        assert labeled_data is None, "'labeled_data' has no effect if 'body_batch' is not None."
+        body_batch = [{**body, **kwargs} for body in body_batch]
+    assert len(body_batch) > 0, "No query to replay."
+
+    arrival_times = schedule.arrival_times()
+    sent = np.full(len(arrival_times), np.nan)
+    completed = np.full(len(arrival_times), np.nan)
+    status_codes = [None] * len(arrival_times)
+    errors = np.ones(len(arrival_times), dtype=bool)
+    loop = asyncio.get_running_loop()
+
+    async with app.asyncio(connections=connections, total_timeout=timeout) as async_app:
+
+        async def send_one(idx, start):
+            sent[idx] = loop.time() - start
+            try:
+                response = await _query_once(async_app, body_batch[idx % len(body_batch)])
+                status_codes[idx] = response.status_code
+                errors[idx] = (
+                    response.status_code != 200
+                    or response.json.get("root", {}).get("errors", None) is not None
+                )
+            except Exception:
+                pass  # failed requests and unexpected responses stay counted as errors
+            completed[idx] = loop.time() - start
+
+        tasks = []
+        start = loop.time()
+        try:
+            for idx, arrival_time in enumerate(arrival_times):
+                delay = start + arrival_time - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.ensure_future(send_one(idx, start)))
+            # a failed query must not cancel the queries still in flight
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    requests = DataFrame(
+        {
+            "body_index": np.arange(len(arrival_times)) % len(body_batch),
+            "scheduled": arrival_times,
+            "sent": sent,
+            "completed": completed,
+            "latency": completed - arrival_times,
+            "service_time": completed - sent,
+            "status_code": status_codes,
+            "error": errors,
+        }
+    )
+    report = _load_test_report(requests, schedule.warmup, percentiles)
+    measured = requests[requests["scheduled"] >= schedule.warmup]
+    measured_duration = schedule.duration - schedule.warmup
+    summary = {
+        "sent": len(measured),
+        "errors": int(measured["error"].sum()),
+        "error_rate": measured["error"].mean() if len(measured) > 0 else np.nan,
+        "throughput": int((~measured["error"]).sum()) / measured_duration,
+    }
+    for percentile in percentiles:
+        summary["latency_p{:g}".format(percentile)] = measured["latency"].quantile(percentile / 100)
+    summary["latency_max"] = measured["latency"].max()
+    report.attrs["requests"] = requests
+    report.attrs["summary"] = summary
+    return report
+
+# %% ../003_module_query.ipynb 202
+def load_test(
+    app: Vespa,  # Connection to a Vespa application.
+    schedule: LoadSchedule,  # Arrival schedule of the queries.
+    body_batch: Optional[List[Dict]] = None,  # Request bodies to replay. Set to None if using 'labeled_data'.
+    labeled_data=None,  # Labelled data whose queries are replayed with `query_model`. Set to None if using 'body_batch'.
+    query_model: Optional[QueryModel] = None,  # Query model used to create the bodies of `labeled_data`.
+    connections: int = 100,  # Number of connections kept open to the application.
+    timeout: float = 30,  # Client timeout in seconds of each query.
+    percentiles: List[float] = [50, 90, 99],  # Latency percentiles reported per second, between 0 and 100.
+    **kwargs,  # Additional parameters to be sent along the request.
+) -> DataFrame:  # One row per second after the warm-up with sent, throughput, errors, error_rate and latency percentiles.
+    "Blocking version of `load_test_async`. Use `await load_test_async(...)` inside a running event loop, e.g. in a notebook."
+    return asyncio.run(
+        load_test_async(
+            app=app,
+            schedule=schedule,
+            body_batch=body_batch,
+            labeled_data=labeled_data,
+            query_model=query_model,
+            connections=connections,
+            timeout=timeout,
+            percentiles=percentiles,
+            **kwargs,
+        )
+    )
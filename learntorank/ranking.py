@@ -9,11 +9,13 @@ import json
 import os
 import os.path
 from typing import Optional
+import numpy as np
 import pandas as pd
 import tensorflow as tf
 import tensorflow_ranking as tfr
 import keras_tuner as kt
 from tensorflow.keras.layers import Normalization
+from .query import _iter_vespa_feature_shards
 
 # %% ../004_module_ranking.ipynb 5
 def keras_linear_model(
@@ -289,6 +291,52 @@ class ListwiseRankingFramework:
         listwise_ds = listwise_ds.batch(batch_size=batch_size)
         return listwise_ds
 
+    def listwise_tf_dataset_from_shards(
+        self, output_dir, feature_names, shuffle_buffer_size, batch_size
+    ):
+        """
+        Create TensorFlow dataframe suited for listwise loss function from the shards written by `store_vespa_features`.
+
+        :param output_dir: The directory holding the Parquet, Arrow IPC or NumPy shards.
+        :param feature_names: Features to be used in the tensorflow model.
+        :param shuffle_buffer_size: The size of the buffer used to sample data from.
+        :param batch_size: The size of the batch for each sample from the dataset.
+        :return: TF dataset
+        """
+        columns = [self.query_id_name, self.target_name] + feature_names
+
+        def read_shards():
+            for df in _iter_vespa_feature_shards(output_dir, columns=columns):
+                yield {
+                    "query_id": df[self.query_id_name].to_numpy(dtype=np.int64),
+                    "label": df[self.target_name].to_numpy(dtype=np.float32),
+                    "features": df[feature_names].to_numpy(dtype=np.float32),
+                }
+
+        ds = tf.data.Dataset.from_generator(
+            read_shards,
+            output_signature={
+                "query_id": tf.TensorSpec(shape=(None,), dtype=tf.int64),
+                "label": tf.TensorSpec(shape=(None,), dtype=tf.float32),
+                "features": tf.TensorSpec(
+                    shape=(None, len(feature_names)), dtype=tf.float32
+                ),
+            },
+        )
+        ds = ds.unbatch().shuffle(buffer_size=shuffle_buffer_size)
+        key_func = lambda x: x[self.query_id_name]
+        reduce_func = lambda key, dataset: dataset.batch(
+            self.number_documents_per_query, drop_remainder=True
+        )
+        listwise_ds = ds.group_by_window(
+            key_func=key_func,
+            reduce_func=reduce_func,
+            window_size=self.number_documents_per_query,
+        )
+        listwise_ds = listwise_ds.map(lambda x: (x["features"], x["label"]))
+        listwise_ds = listwise_ds.batch(batch_size=batch_size)
+        return listwise_ds
+
     def create_dataset(self, df_or_file, feature_names):
         if isinstance(df_or_file, pd.DataFrame):
             ds = self.listwise_tf_dataset_from_df(
@@ -297,6 +345,13 @@ class ListwiseRankingFramework:
                 shuffle_buffer_size=self.shuffle_buffer_size,
                 batch_size=self.batch_size,
             )
+        elif os.path.isdir(df_or_file):
+            ds = self.listwise_tf_dataset_from_shards(
+                output_dir=df_or_file,
+                feature_names=feature_names,
+                shuffle_buffer_size=self.shuffle_buffer_size,
+                batch_size=self.batch_size,
+            )
         else:
             ds = self.listwise_tf_dataset_from_csv(
                 file_path=df_or_file,
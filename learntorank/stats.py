@@ -1,85 +1,681 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: ../001_module_stats.ipynb.
 
 # %% auto 0
-__all__ = ['bootstrap_sampling', 'compute_evaluation_estimates']
+__all__ = ['bootstrap_sampling', 'compute_evaluation_estimates', 'paired_bootstrap_test', 'permutation_test',
+           'StreamingBootstrap', 'compute_streaming_evaluation_estimates', 'RunningMoments', 'QuantileSketch',
+           'LatencyHistogram']
 
 # %% ../001_module_stats.ipynb 4
-from typing import Callable, List, Optional
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import combinations, repeat
+from typing import Callable, Iterable, List, Optional, Tuple, Union
 import numpy as np
 import pandas as pd
+from fastcore.utils import patch
 
 # %% ../001_module_stats.ipynb 6
+_MAX_CHUNK_ELEMENTS = 2**22  # Upper bound on the number of values materialized per batch of resamples.
+
+def _resample_indices(
+    n_rows: int,  # Number of rows available for resampling.
+    n_resamples: int,  # Number of resamples to draw.
+    stream: np.random.SeedSequence,  # Random stream of the batch of resamples.
+) -> np.ndarray:  # Array of shape (n_resamples, n_rows) containing resample indices.
+    "Draw the indices of a batch of bootstrap resamples in a single call to the random stream of the batch."
+    return np.random.default_rng(stream).integers(0, n_rows, size=(n_resamples, n_rows))
+
+# %% ../001_module_stats.ipynb 7
+# built-in estimators skip missing values, as the pandas reductions do
+_NAN_ESTIMATORS = {np.mean: np.nanmean, np.median: np.nanmedian}
+
+def _estimate_chunk(
+    values: np.ndarray,  # Array of shape (n_rows, n_columns) to be resampled.
+    indices: np.ndarray,  # Array of shape (n_resamples, n_rows) containing resample indices.
+    estimator: Callable  # estimator function that accepts an array-like argument and an `axis` argument.
+) -> np.ndarray:  # Array of shape (n_resamples, n_columns) with one estimate per resample and column.
+    "Compute the estimator for a batch of bootstrap resamples."
+    n_resamples, n_rows = indices.shape
+    if estimator is np.mean or estimator is np.nanmean:
+        # Resample counts avoid materializing the (n_resamples, n_rows, n_columns) array
+        offsets = (np.arange(n_resamples) * n_rows)[:, None]
+        counts = np.bincount(
+            (indices + offsets).ravel(), minlength=n_resamples * n_rows
+        ).reshape(n_resamples, n_rows).astype(values.dtype)
+        missing = np.isnan(values)
+        if not missing.any():
+            return counts @ values / n_rows
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return counts @ np.where(missing, 0, values) / (counts @ ~missing)
+    estimator = _NAN_ESTIMATORS.get(estimator, estimator)
+    return np.asarray(estimator(values[indices], axis=1))
+
+# %% ../001_module_stats.ipynb 8
+def _bootstrap_chunks(
+    values: np.ndarray,  # Array of shape (n_rows, n_columns) to be resampled.
+    estimator: Callable,  # estimator function that accepts an array-like argument and an `axis` argument.
+    chunks: List[Tuple[int, np.random.SeedSequence]],  # Number of resamples and random stream of each batch of resamples.
+) -> np.ndarray:  # Array of shape (n_resamples, n_columns) with the bootstrap estimates.
+    "Compute bootstrap estimates for consecutive batches of resamples."
+    return np.concatenate(
+        [
+            _estimate_chunk(values, _resample_indices(values.shape[0], n_resamples, stream), estimator) 
+            for n_resamples, stream in chunks
+        ]
+    )
+
+# %% ../001_module_stats.ipynb 9
+def _bootstrap_values(
+    values: np.ndarray,  # Array of shape (n_rows, n_columns) to be resampled.
+    estimator: Callable,  # estimator function that accepts an array-like argument and an `axis` argument.
+    n_boot: int,  # Number of bootstrap estimates to compute.
+    rng: np.random.Generator,  # Random number generator used to seed the random streams of the resamples.
+    chunk_size: Optional[int] = None,  # Number of bootstrap samples computed at once.
+    executor: Optional[Executor] = None,  # Executor used to compute batches of resamples in parallel. Computed serially if None.
+) -> np.ndarray:  # Array of shape (n_boot, n_columns) with the bootstrap estimates.
+    "Compute bootstrap estimates for every column of `values` in batches of resamples."
+    n_rows, n_columns = values.shape
+    if n_rows == 0:
+        return np.full((n_boot, n_columns), np.nan)
+    if not chunk_size:
+        chunk_size = max(1, _MAX_CHUNK_ELEMENTS // (n_rows * max(n_columns, 1)))
+    sizes = [min(chunk_size, n_boot - start) for start in range(0, n_boot, chunk_size)]
+    if not sizes:
+        return np.empty((0, n_columns))
+    # one stream per batch, so that the estimates do not depend on how batches are split into tasks
+    streams = np.random.SeedSequence(int(rng.integers(0, np.iinfo(np.int64).max))).spawn(len(sizes))
+    chunks = list(zip(sizes, streams))
+    if executor is None:
+        return _bootstrap_chunks(values, estimator, chunks)
+    # one task of contiguous batches per worker, so that `values` is sent to each worker once
+    n_tasks = min(len(chunks), getattr(executor, "_max_workers", None) or os.cpu_count() or 1)
+    bounds = np.linspace(0, len(chunks), n_tasks + 1).astype(int)
+    tasks = [chunks[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    return np.concatenate(
+        list(executor.map(_bootstrap_chunks, repeat(values), repeat(estimator), tasks))
+    )
+
+# %% ../001_module_stats.ipynb 10
+def _bootstrap_executor(
+    n_jobs: int,  # Number of processes. Use -1 for all available cpus.
+    executor: Optional[Executor] = None,  # Executor provided by the user.
+):
+    "Context manager with the executor used to compute bootstrap estimates, None when running serially."
+    if executor is not None or n_jobs == 1:
+        return nullcontext(executor)
+    return ProcessPoolExecutor(max_workers=None if n_jobs < 0 else n_jobs)
+
+# %% ../001_module_stats.ipynb 11
 def bootstrap_sampling(
     data: pd.DataFrame,  # Data containing the columns we want to generate bootstrap estimates from. 
-    estimator: Callable = np.mean,  # estimator function that accepts an array-like argument. 
+    estimator: Callable = np.mean,  # estimator function called with an array of bootstrap samples and an `axis` argument, e.g. `np.mean`. `np.mean` and `np.median` skip missing values.
     n_boot: int = 1000,  # Number of bootstrap estimates to compute.     
-    columns_to_exclude: List[str] = None  # Column names to exclude.
+    columns_to_exclude: List[str] = None,  # Column names to exclude.
+    seed: Optional[Union[int, np.random.Generator]] = None,  # Seed or random number generator used to draw the bootstrap samples.
+    chunk_size: Optional[int] = None,  # Number of bootstrap samples computed at once. Default to a value that keeps each batch around `2**22` elements.
+    n_jobs: int = 1,  # Number of processes used to compute the bootstrap estimates. Use -1 for all available cpus.
+    executor: Optional[Executor] = None,  # Executor used to compute the bootstrap estimates. Overrides `n_jobs`.
 ):
     "Compute bootstrap estimates of the data distribution"
     if not columns_to_exclude:
         columns_to_exclude = []
     data = data[[x for x in data.columns if x not in columns_to_exclude]]
-    boot_dist = []
-    for i in range(int(n_boot)):
-        sample = data.sample(n=data.shape[0], replace=True)
-        boot_dist.append(estimator(sample, axis=0))
-    return pd.DataFrame(boot_dist)
+    with _bootstrap_executor(n_jobs, executor) as pool:
+        boot_dist = _bootstrap_values(
+            values=data.to_numpy(dtype=float), 
+            estimator=estimator, 
+            n_boot=int(n_boot), 
+            rng=np.random.default_rng(seed), 
+            chunk_size=chunk_size,
+            executor=pool,
+        )
+    return pd.DataFrame(boot_dist, columns=data.columns)
+
+# %% ../001_module_stats.ipynb 39
+def _interval_table(
+    boot_dist: np.ndarray,  # Bootstrap estimates of shape (n_models, n_boot, n_metrics).
+    models: List[str],  # Model names.
+    metrics: List[str],  # Metric names.
+    quantile_low: float,  # lower quantile to compute confidence interval
+    quantile_high: float,  # upper quantile to compute confidence interval
+    quantiles: Optional[List[float]] = None,  # Quantile levels to compute. Overrides `quantile_low` and `quantile_high`.
+) -> pd.DataFrame:  # One row per metric and model, one column per quantile level.
+    "Summarize bootstrap estimates into a tidy table of quantiles."
+    if quantiles is None:
+        levels, names = [quantile_low, 0.5, quantile_high], ["low", "median", "high"]
+    else:
+        levels, names = list(quantiles), list(quantiles)
+    estimates = np.nanquantile(boot_dist, q=levels, axis=1)  # (n_levels, n_models, n_metrics)
+    estimates = pd.DataFrame(
+        estimates.transpose(2, 1, 0).reshape(-1, len(levels)), columns=names
+    )
+    estimates.insert(0, "model", np.tile(np.asarray(models), len(metrics)))
+    estimates.insert(0, "metric", np.repeat(metrics, len(models)))
+    return estimates
 
-# %% ../001_module_stats.ipynb 22
+# %% ../001_module_stats.ipynb 40
 def compute_evaluation_estimates(
     df: pd.DataFrame,  # Evaluations per query data, usually obtained pyvespa evaluate method.
     n_boot: int = 1000,  # Number of bootstrap samples.  
-    estimator: Callable = np.mean,  # estimator function that accepts an array-like argument. 
+    estimator: Callable = np.mean,  # estimator function called with an array of bootstrap samples and an `axis` argument, e.g. `np.mean`. `np.mean` and `np.median` skip missing values.
     quantile_low: float = 0.025,  # lower quantile to compute confidence interval
-    quantile_high = 0.975  # upper quantile to compute confidence interval
+    quantile_high = 0.975,  # upper quantile to compute confidence interval
+    quantiles: Optional[List[float]] = None,  # Quantile levels to compute. Overrides `quantile_low` and `quantile_high`, each level becomes a column of the output.
+    seed: Optional[Union[int, np.random.Generator]] = None,  # Seed or random number generator used to draw the bootstrap samples.
+    n_jobs: int = 1,  # Number of processes used to compute the bootstrap estimates. Use -1 for all available cpus.
+    executor: Optional[Executor] = None,  # Executor used to compute the bootstrap estimates. Overrides `n_jobs`.
 ):
     "Compute estimate and confidence interval for evaluation per query metrics."
-    estimates = (
-        df
-        .groupby("model")
-        .apply(bootstrap_sampling, 
-               estimator = estimator, 
-               n_boot = n_boot, 
-               columns_to_exclude = ["query_id", "model"]
-              )
-        .reset_index(level="model")
-        .groupby("model")
-        .agg(
+    codes, models = pd.factorize(df["model"], sort=True)
+    metrics = sorted([x for x in df.columns if x not in ["query_id", "model"]])
+    # contiguous block of rows per model, so each model is a slice of a single array
+    order = np.argsort(codes, kind="stable")
+    values = df[metrics].to_numpy(dtype=float)[order]
+    bounds = np.searchsorted(codes[order], np.arange(len(models) + 1))
+    rng = np.random.default_rng(seed)
+    with _bootstrap_executor(n_jobs, executor) as pool:
+        boot_dist = np.stack(
             [
-                lambda x: np.quantile(x, q=quantile_low), 
-                lambda x: np.quantile(x, q=0.5), 
-                lambda x: np.quantile(x, q=quantile_high)
+                _bootstrap_values(
+                    values[start:end], 
+                    estimator, 
+                    int(n_boot), 
+                    rng, 
+                    executor=pool, 
+                )
+                for start, end in zip(bounds[:-1], bounds[1:])
             ]
-        )
-        .rename(
-            columns={
-                "<lambda_0>": "low", 
-                "<lambda_1>": "median", 
-                "<lambda_2>": "high"
-            }
-        )
-        .T
-        .reset_index()
-        .rename_axis(None, axis=1)
-        .rename(
-            columns={
-                "level_0": "metric", "level_1": "quantile"
-            }
-        )
+        )  # (n_models, n_boot, n_metrics)
+    return _interval_table(boot_dist, models, metrics, quantile_low, quantile_high, quantiles)
+
+# %% ../001_module_stats.ipynb 61
+def _paired_differences(
+    df: pd.DataFrame,  # Evaluations per query data, containing the columns `model` and `query_id`.
+):
+    "Align per query metrics across models and compute the differences for every pair of models."
+    metrics = sorted([x for x in df.columns if x not in ["query_id", "model"]])
+    models = sorted(df["model"].unique())
+    assert len(models) > 1, "At least two models are needed for paired comparisons."
+    # only queries evaluated by every model can be paired
+    wide = df.pivot(index="query_id", columns="model", values=metrics).dropna()
+    values = wide.to_numpy(dtype=float).reshape(wide.shape[0], len(metrics), len(models))
+    pairs = list(combinations(range(len(models)), 2))
+    first, second = [list(x) for x in zip(*pairs)]
+    differences = values[:, :, first] - values[:, :, second]  # (n_queries, n_metrics, n_pairs)
+    pair_names = [(models[i], models[j]) for i, j in pairs]
+    return metrics, pair_names, differences.reshape(wide.shape[0], -1)
+
+# %% ../001_module_stats.ipynb 62
+def _paired_summary(
+    metrics: List[str],  # Metric names.
+    pair_names: List[Tuple],  # Model names of each pair of models.
+    differences: np.ndarray,  # Per query differences of shape (n_queries, n_metrics * n_pairs).
+    low: np.ndarray,  # Lower bound of the confidence interval of each difference.
+    high: np.ndarray,  # Upper bound of the confidence interval of each difference.
+    p_value: np.ndarray,  # p-value of each difference.
+) -> pd.DataFrame:
+    "Build the tidy output of the paired comparisons."
+    difference = differences.mean(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effect_size = difference / differences.std(axis=0, ddof=1)
+    return pd.DataFrame(
+        {
+            "metric": np.repeat(metrics, len(pair_names)),
+            "model_a": [a for _ in metrics for a, b in pair_names],
+            "model_b": [b for _ in metrics for a, b in pair_names],
+            "difference": difference,
+            "effect_size": effect_size,
+            "low": low,
+            "high": high,
+            "p_value": p_value,
+        }
     )
-    estimates = pd.melt(estimates, id_vars=["metric", "quantile"])    
-    estimates = (
-        pd.pivot(
-            estimates,
-            index=[
-                x for x in estimates.columns if x not in ["quantile", "value"]
-            ], 
-            columns="quantile", values="value"
-        )
-        .reset_index()
-        .rename_axis(None, axis=1)
-        .rename(columns={"variable":"model"})[
-            ["metric", "model", "low", "median", "high"]
-        ]
+
+# %% ../001_module_stats.ipynb 63
+def paired_bootstrap_test(
+    df: pd.DataFrame,  # Evaluations per query data, usually obtained from `evaluate` with `per_query=True`.
+    n_boot: int = 1000,  # Number of bootstrap samples.
+    estimator: Callable = np.mean,  # estimator function called with an array of bootstrap samples and an `axis` argument, e.g. `np.mean`.
+    quantile_low: float = 0.025,  # lower quantile to compute confidence interval
+    quantile_high: float = 0.975,  # upper quantile to compute confidence interval
+    seed: Optional[Union[int, np.random.Generator]] = None,  # Seed or random number generator used to draw the bootstrap samples.
+) -> pd.DataFrame:  # One row per metric and pair of models with the difference `model_a - model_b`, its confidence interval and p-value.
+    "Compare every pair of models with a paired bootstrap of the per query metric differences."
+    metrics, pair_names, differences = _paired_differences(df)
+    # a single resample index matrix is shared by every pair of models and metric
+    boot_dist = _bootstrap_values(
+        differences, estimator, int(n_boot), np.random.default_rng(seed)
     )
-    return estimates
+    low, high = np.quantile(boot_dist, q=[quantile_low, quantile_high], axis=0)
+    p_value = np.minimum(
+        1, 2 * np.minimum((boot_dist <= 0).mean(axis=0), (boot_dist >= 0).mean(axis=0))
+    )
+    return _paired_summary(metrics, pair_names, differences, low, high, p_value)
+
+# %% ../001_module_stats.ipynb 70
+def permutation_test(
+    df: pd.DataFrame,  # Evaluations per query data, usually obtained from `evaluate` with `per_query=True`.
+    n_permutations: int = 1000,  # Number of random sign flips of the per query differences.
+    quantile_low: float = 0.025,  # lower quantile to compute confidence interval
+    quantile_high: float = 0.975,  # upper quantile to compute confidence interval
+    seed: Optional[Union[int, np.random.Generator]] = None,  # Seed or random number generator used to draw the permutations.
+    chunk_size: Optional[int] = None,  # Number of permutations computed at once. Default to a value that keeps each batch around `2**22` elements.
+) -> pd.DataFrame:  # One row per metric and pair of models with the difference `model_a - model_b`, its confidence interval and p-value.
+    """
+    Compare every pair of models with a paired randomization test of the mean per query metric differences.
+
+    Under the null hypothesis the model labels within a query are exchangeable, so the sign of each per query 
+    difference is flipped at random. The confidence interval is obtained by centering the randomization 
+    distribution at the observed difference.
+    """
+    metrics, pair_names, differences = _paired_differences(df)
+    n_queries, n_columns = differences.shape
+    rng = np.random.default_rng(seed)
+    if not chunk_size:
+        chunk_size = max(1, _MAX_CHUNK_ELEMENTS // max(n_queries, 1))
+    null_dist = []
+    for start in range(0, int(n_permutations), chunk_size):
+        size = min(chunk_size, int(n_permutations) - start)
+        signs = 2.0 * rng.integers(0, 2, size=(size, n_queries)) - 1
+        null_dist.append(signs @ differences / n_queries)
+    null_dist = np.concatenate(null_dist)
+    difference = differences.mean(axis=0)
+    p_value = (1 + (np.abs(null_dist) >= np.abs(difference)).sum(axis=0)) / (null_dist.shape[0] + 1)
+    null_low, null_high = np.quantile(null_dist, q=[quantile_low, quantile_high], axis=0)
+    return _paired_summary(
+        metrics, pair_names, differences, difference - null_high, difference - null_low, p_value
+    )
+
+# %% ../001_module_stats.ipynb 77
+class StreamingBootstrap(object):
+    def __init__(
+        self, 
+        n_boot: int = 1000,  # Number of bootstrap replicates.
+        seed: Optional[Union[int, np.random.Generator, np.random.SeedSequence]] = None,  # Seed or random number generator used to draw the Poisson weights. Use different seeds for states that will be merged.
+    ) -> None:
+        """
+        Online Poisson bootstrap of the mean of per query evaluation metrics.
+
+        Memory usage is proportional to `n_boot` times the number of models and metrics, independently 
+        of the number of queries consumed.
+        """
+        self.n_boot = int(n_boot)
+        self.rng = np.random.default_rng(seed)
+        self.metrics = None
+        self.sums = {}  # model -> weighted metric sums of shape (n_boot, n_metrics)
+        self.weights = {}  # model -> total weights of shape (n_boot,)
+        self.n_queries = {}  # model -> number of queries consumed
+
+# %% ../001_module_stats.ipynb 78
+@patch
+def update(
+    self: StreamingBootstrap, 
+    df: pd.DataFrame  # Chunk of evaluations per query data, containing the column `model`.
+) -> StreamingBootstrap:  # The updated state.
+    "Update the bootstrap replicates with a chunk of per query evaluations."
+    metrics = sorted([x for x in df.columns if x not in ["query_id", "model"]])
+    if self.metrics is None:
+        self.metrics = metrics
+    assert metrics == self.metrics, "Every chunk must contain the metrics {}.".format(self.metrics)
+    chunk_rows = max(1, _MAX_CHUNK_ELEMENTS // self.n_boot)
+    for model, model_df in df.groupby("model", sort=False):
+        values = model_df[metrics].to_numpy(dtype=float)
+        if model not in self.sums:
+            self.sums[model] = np.zeros((self.n_boot, len(metrics)))
+            self.weights[model] = np.zeros(self.n_boot)
+            self.n_queries[model] = 0
+        for start in range(0, values.shape[0], chunk_rows):
+            rows = values[start : start + chunk_rows]
+            weights = self.rng.poisson(1.0, size=(self.n_boot, rows.shape[0])).astype(float)
+            self.sums[model] += weights @ rows
+            self.weights[model] += weights.sum(axis=1)
+        self.n_queries[model] += values.shape[0]
+    return self
+
+# %% ../001_module_stats.ipynb 79
+@patch
+def merge(
+    self: StreamingBootstrap, 
+    other: StreamingBootstrap  # State computed on a disjoint set of queries, with a different seed.
+) -> StreamingBootstrap:  # The merged state.
+    "Merge the bootstrap replicates of another state into this one."
+    assert self.n_boot == other.n_boot, "States must have the same number of bootstrap replicates."
+    if other.metrics is None:
+        return self
+    if self.metrics is None:
+        self.metrics = other.metrics
+    assert self.metrics == other.metrics, "States must contain the same metrics."
+    for model in other.sums:
+        if model not in self.sums:
+            self.sums[model] = np.zeros((self.n_boot, len(self.metrics)))
+            self.weights[model] = np.zeros(self.n_boot)
+            self.n_queries[model] = 0
+        self.sums[model] += other.sums[model]
+        self.weights[model] += other.weights[model]
+        self.n_queries[model] += other.n_queries[model]
+    return self
+
+# %% ../001_module_stats.ipynb 80
+@patch
+def estimates(
+    self: StreamingBootstrap, 
+    quantile_low: float = 0.025,  # lower quantile to compute confidence interval
+    quantile_high: float = 0.975,  # upper quantile to compute confidence interval
+    quantiles: Optional[List[float]] = None,  # Quantile levels to compute. Overrides `quantile_low` and `quantile_high`, each level becomes a column of the output.
+) -> pd.DataFrame:  # Same format as the output of `compute_evaluation_estimates`.
+    "Compute estimate and confidence interval of the mean for each model and metric consumed so far."
+    assert self.metrics is not None, "No data has been consumed."
+    models = sorted(self.sums)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        boot_dist = np.stack(
+            [self.sums[model] / self.weights[model][:, None] for model in models]
+        )  # (n_models, n_boot, n_metrics)
+    return _interval_table(boot_dist, models, self.metrics, quantile_low, quantile_high, quantiles)
+
+# %% ../001_module_stats.ipynb 81
+def compute_streaming_evaluation_estimates(
+    chunks: Iterable[pd.DataFrame],  # Chunks of evaluations per query data, e.g. `pd.read_csv(..., chunksize=100000)`.
+    n_boot: int = 1000,  # Number of bootstrap replicates.
+    quantile_low: float = 0.025,  # lower quantile to compute confidence interval
+    quantile_high: float = 0.975,  # upper quantile to compute confidence interval
+    quantiles: Optional[List[float]] = None,  # Quantile levels to compute. Overrides `quantile_low` and `quantile_high`, each level becomes a column of the output.
+    seed: Optional[Union[int, np.random.Generator]] = None,  # Seed or random number generator used to draw the Poisson weights.
+) -> pd.DataFrame:  # Same format as the output of `compute_evaluation_estimates`.
+    "Compute estimate and confidence interval of the mean of per query metrics consumed in chunks."
+    state = StreamingBootstrap(n_boot=n_boot, seed=seed)
+    for chunk in chunks:
+        state.update(chunk)
+    return state.estimates(
+        quantile_low=quantile_low, quantile_high=quantile_high, quantiles=quantiles
+    )
+
+# %% ../001_module_stats.ipynb 90
+class RunningMoments(object):
+    def __init__(self) -> None:
+        "Count, sum, mean, variance, minimum and maximum of a stream of values, updated with Welford's method."
+        self.count = 0
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences from the mean
+        self.min = np.nan
+        self.max = np.nan
+
+# %% ../001_module_stats.ipynb 91
+@patch
+def _combine(
+    self: RunningMoments, 
+    count: int,  # Number of values of the other part.
+    total: float,  # Sum of the values of the other part.
+    mean: float,  # Mean of the values of the other part.
+    m2: float,  # Sum of squared differences from the mean of the other part.
+    minimum: float,  # Minimum of the other part.
+    maximum: float,  # Maximum of the other part.
+) -> RunningMoments:
+    if count == 0:
+        return self
+    n = self.count + count
+    delta = mean - self.mean
+    self.mean += delta * count / n
+    self.m2 += m2 + delta**2 * self.count * count / n
+    self.count = n
+    self.sum += total
+    self.min = np.fmin(self.min, minimum)
+    self.max = np.fmax(self.max, maximum)
+    return self
+
+@patch
+def update(
+    self: RunningMoments, 
+    values: np.ndarray  # New values. Missing values (NaN) are ignored.
+) -> RunningMoments:  # The updated state.
+    "Update the moments with an array of values."
+    values = np.asarray(values, dtype=float).ravel()
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return self
+    mean = values.mean()
+    return self._combine(
+        values.size, values.sum(), mean, ((values - mean) ** 2).sum(), values.min(), values.max()
+    )
+
+@patch
+def merge(
+    self: RunningMoments, 
+    other: RunningMoments  # Moments of another part of the stream.
+) -> RunningMoments:  # The merged state.
+    "Merge the moments of another state into this one."
+    return self._combine(other.count, other.sum, other.mean, other.m2, other.min, other.max)
+
+@patch
+def var(
+    self: RunningMoments, 
+    ddof: int = 1  # Delta degrees of freedom, 1 for the sample variance as in pandas.
+) -> float:
+    "Variance of the values consumed so far, NaN if there are not enough values."
+    return self.m2 / (self.count - ddof) if self.count > ddof else np.nan
+
+@patch
+def std(
+    self: RunningMoments, 
+    ddof: int = 1  # Delta degrees of freedom, 1 for the sample standard deviation as in pandas.
+) -> float:
+    "Standard deviation of the values consumed so far, NaN if there are not enough values."
+    return float(np.sqrt(self.var(ddof=ddof)))
+
+# %% ../001_module_stats.ipynb 95
+def _compress_centroids(
+    means: np.ndarray,  # Centroid means.
+    weights: np.ndarray,  # Centroid weights.
+    compression: int,  # Larger values keep more centroids.
+) -> Tuple[np.ndarray, np.ndarray]:  # Means and weights of the merged centroids, sorted by mean.
+    "Merge adjacent centroids while their weight stays below the t-digest size limit at their quantile."
+    order = np.argsort(means, kind="stable")
+    means, weights = means[order], weights[order]
+    total = weights.sum()
+    merged_means, merged_weights = [], []
+    cumulative = 0.0
+    current_mean, current_weight = means[0], weights[0]
+    for mean, weight in zip(means[1:], weights[1:]):
+        q = (cumulative + (current_weight + weight) / 2) / total
+        if current_weight + weight <= max(1.0, 4 * total * q * (1 - q) / compression):
+            current_weight += weight
+            current_mean += (mean - current_mean) * weight / current_weight
+        else:
+            merged_means.append(current_mean)
+            merged_weights.append(current_weight)
+            cumulative += current_weight
+            current_mean, current_weight = mean, weight
+    merged_means.append(current_mean)
+    merged_weights.append(current_weight)
+    return np.array(merged_means), np.array(merged_weights)
+
+# %% ../001_module_stats.ipynb 96
+class QuantileSketch(object):
+    def __init__(
+        self, 
+        compression: int = 200,  # Larger values keep more centroids and give more accurate quantiles.
+        max_exact: int = 10000,  # Values are kept exactly until the sketch consumed more than this number of values.
+    ) -> None:
+        """
+        Mergeable t-digest like sketch of the distribution of a stream of values.
+
+        Quantiles are only exact, and equal to `np.quantile`, while at most `max_exact` values were consumed. 
+        Afterwards they are approximated from at most a few times `compression` weighted centroids, which are 
+        denser at the tails of the distribution.
+        """
+        self.compression = compression
+        self.max_exact = max_exact
+        self.count = 0
+        self.min = np.nan
+        self.max = np.nan
+        self._buffer = []  # arrays of values not yet merged into the centroids
+        self._buffered = 0
+        self._means = None  # centroid means, None while the sketch is exact
+        self._weights = None
+
+# %% ../001_module_stats.ipynb 97
+@patch
+def _flush(self: QuantileSketch) -> None:
+    values = np.concatenate(self._buffer) if len(self._buffer) > 0 else np.empty(0)
+    if self._means is None:
+        means, weights = values, np.ones(values.size)
+    else:
+        means = np.concatenate([self._means, values])
+        weights = np.concatenate([self._weights, np.ones(values.size)])
+    self._means, self._weights = _compress_centroids(means, weights, self.compression)
+    self._buffer, self._buffered = [], 0
+
+@patch
+def update(
+    self: QuantileSketch, 
+    values: np.ndarray  # New values. Missing values (NaN) are ignored.
+) -> QuantileSketch:  # The updated state.
+    "Add an array of values to the sketch."
+    values = np.asarray(values, dtype=float).ravel()
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return self
+    self._buffer.append(values)
+    self._buffered += values.size
+    self.count += values.size
+    self.min = np.fmin(self.min, values.min())
+    self.max = np.fmax(self.max, values.max())
+    if self.count > self.max_exact and self._buffered > self.compression:
+        self._flush()
+    return self
+
+@patch
+def merge(
+    self: QuantileSketch, 
+    other: QuantileSketch  # Sketch of another part of the stream.
+) -> QuantileSketch:  # The merged state.
+    "Merge the values summarized by another sketch into this one."
+    if other.count == 0:
+        return self
+    self._buffer.extend(other._buffer)
+    self._buffered += other._buffered
+    self.count += other.count
+    self.min = np.fmin(self.min, other.min)
+    self.max = np.fmax(self.max, other.max)
+    if other._means is not None:
+        if self._means is None:
+            self._means, self._weights = other._means, other._weights
+        else:
+            self._means = np.concatenate([self._means, other._means])
+            self._weights = np.concatenate([self._weights, other._weights])
+        self._flush()
+    elif self.count > self.max_exact:
+        self._flush()
+    return self
+
+@patch
+def quantile(
+    self: QuantileSketch, 
+    q: Union[float, List[float]]  # Quantile level or list of levels between 0 and 1.
+) -> Union[float, np.ndarray]:  # Quantile estimates, NaN if the sketch is empty.
+    "Estimate quantiles of the values consumed so far, interpolating linearly between centroids."
+    if self.count == 0:
+        return np.full(np.shape(q), np.nan) if np.ndim(q) > 0 else np.nan
+    if self._means is None:
+        return np.quantile(np.concatenate(self._buffer), q)
+    if self._buffered > 0:
+        self._flush()
+    centers = np.cumsum(self._weights) - self._weights / 2
+    positions = np.concatenate([[0.0], centers, [self.count]])
+    values = np.concatenate([[self.min], self._means, [self.max]])
+    return np.interp(np.asarray(q) * self.count, positions, values)
+
+# %% ../001_module_stats.ipynb 102
+class LatencyHistogram(object):
+    def __init__(
+        self, 
+        lowest: float = 1e-6,  # Smallest latency distinguished by the histogram, in seconds. Smaller values share a single bucket.
+        significant_digits: int = 2,  # Decimal digits of precision. Bucket bounds grow by a factor of `1 + 10**-significant_digits`.
+    ) -> None:
+        "Mergeable histogram of latencies with buckets of bounded relative width."
+        assert lowest > 0, "lowest must be positive."
+        self.lowest = lowest
+        self.significant_digits = significant_digits
+        self.growth = 1 + 10**-significant_digits
+        self.counts = np.zeros(1, dtype=np.int64)  # bucket 0 holds values below `lowest`
+        self.count = 0
+        self.sum = 0.0
+        self.min = np.nan
+        self.max = np.nan
+
+# %% ../001_module_stats.ipynb 103
+@patch
+def bounds(
+    self: LatencyHistogram, 
+    buckets: np.ndarray  # Bucket indices.
+) -> Tuple[np.ndarray, np.ndarray]:  # Lower and upper bounds of the buckets.
+    "Bounds of buckets, bucket `k > 0` covering `[lowest * growth**(k - 1), lowest * growth**k)`."
+    buckets = np.asarray(buckets)
+    upper = self.lowest * self.growth ** buckets.astype(float)
+    lower = np.where(buckets > 0, upper / self.growth, 0.0)
+    return lower, upper
+
+@patch
+def record(
+    self: LatencyHistogram, 
+    values: np.ndarray  # Latencies in seconds. Missing values (NaN) are ignored.
+) -> LatencyHistogram:  # The updated histogram.
+    "Record an array of latencies."
+    values = np.asarray(values, dtype=float).ravel()
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return self
+    buckets = np.zeros(values.size, dtype=np.int64)
+    above = values >= self.lowest
+    buckets[above] = np.floor(np.log(values[above] / self.lowest) / np.log(self.growth)).astype(np.int64) + 1
+    counts = np.bincount(buckets)
+    if counts.size > self.counts.size:
+        self.counts = np.pad(self.counts, (0, counts.size - self.counts.size))
+    self.counts[: counts.size] += counts
+    self.count += values.size
+    self.sum += values.sum()
+    self.min = np.fmin(self.min, values.min())
+    self.max = np.fmax(self.max, values.max())
+    return self
+
+@patch
+def merge(
+    self: LatencyHistogram, 
+    other: LatencyHistogram  # Histogram with the same `lowest` and `significant_digits`.
+) -> LatencyHistogram:  # The merged histogram.
+    "Add the counts of another histogram to this one."
+    assert (self.lowest, self.significant_digits) == (other.lowest, other.significant_digits), \
+        "Histograms must have the same lowest and significant_digits."
+    if other.counts.size > self.counts.size:
+        self.counts = np.pad(self.counts, (0, other.counts.size - self.counts.size))
+    self.counts[: other.counts.size] += other.counts
+    self.count += other.count
+    self.sum += other.sum
+    self.min = np.fmin(self.min, other.min)
+    self.max = np.fmax(self.max, other.max)
+    return self
+
+# %% ../001_module_stats.ipynb 104
+@patch
+def percentile(
+    self: LatencyHistogram, 
+    q: Union[float, List[float]]  # Percentile level or list of levels between 0 and 100.
+) -> Union[float, np.ndarray]:  # Latencies, NaN if the histogram is empty.
+    "Latency below which `q` percent of the recorded values fall, within the precision of the buckets."
+    levels = np.asarray(q, dtype=float) / 100
+    if self.count == 0:
+        return np.full(levels.shape, np.nan) if levels.ndim > 0 else np.nan
+    ranks = np.maximum(1, np.ceil(levels * self.count))
+    buckets = np.searchsorted(np.cumsum(self.counts), ranks)
+    lower, upper = self.bounds(buckets)
+    values = np.clip((lower + upper) / 2, self.min, self.max)
+    values = np.where(levels <= 0, self.min, np.where(levels >= 1, self.max, values))
+    return values if levels.ndim > 0 else float(values)
+
+@patch
+def buckets(self: LatencyHistogram) -> pd.DataFrame:  # Lower and upper bounds in seconds and count of each non-empty bucket.
+    "Non-empty buckets of the histogram."
+    buckets = np.flatnonzero(self.counts)
+    lower, upper = self.bounds(buckets)
+    return pd.DataFrame({"lower": lower, "upper": upper, "count": self.counts[buckets]})